@@ -0,0 +1,33 @@
+"""add indexes backing list filters and keyset pagination
+
+Revision ID: 20261018_0001
+Revises: f26643d7b17d
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0001'
+down_revision = 'f26643d7b17d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_quotes_status', 'quotes', ['status', 'id'], unique=False)
+    op.create_index('idx_quotes_created_at', 'quotes', ['created_at'], unique=False)
+    op.create_index('idx_quote_items_quote', 'quote_items', ['quote_id', 'id'], unique=False)
+    op.create_index('idx_work_orders_status', 'work_orders', ['status', 'id'], unique=False)
+    op.create_index('idx_work_orders_created_at', 'work_orders', ['created_at'], unique=False)
+    op.create_index('idx_invoices_created_at', 'invoices', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_invoices_created_at', table_name='invoices')
+    op.drop_index('idx_work_orders_created_at', table_name='work_orders')
+    op.drop_index('idx_work_orders_status', table_name='work_orders')
+    op.drop_index('idx_quote_items_quote', table_name='quote_items')
+    op.drop_index('idx_quotes_created_at', table_name='quotes')
+    op.drop_index('idx_quotes_status', table_name='quotes')
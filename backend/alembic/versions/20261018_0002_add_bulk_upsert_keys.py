@@ -0,0 +1,53 @@
+"""unique natural keys for bulk upserts (stock item, customer rfc)
+
+Revision ID: 20261018_0002
+Revises: 20261018_0001
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0002'
+down_revision = '20261018_0001'
+branch_labels = None
+depends_on = None
+
+_RFC_KEYED = sa.text("rfc NOT IN ('XAXX010101000', 'XEXX010101000')")
+
+
+def _check_unique(conn, table: str, column: str, where: str = "") -> None:
+    duplicates = conn.execute(
+        sa.text(
+            f"SELECT {column} FROM {table} {where} GROUP BY {column} HAVING count(*) > 1"
+        )
+    ).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"{table}.{column} is duplicated for: " + ", ".join(map(str, duplicates))
+            + "; merge them before upgrading"
+        )
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    _check_unique(conn, 'stock', 'item')
+    _check_unique(conn, 'customers', 'rfc', f"WHERE {_RFC_KEYED.text}")
+    op.drop_index('idx_stock_item', table_name='stock')
+    op.create_index('ux_stock_item', 'stock', ['item'], unique=True)
+    op.create_index(
+        'ux_customers_rfc',
+        'customers',
+        ['rfc'],
+        unique=True,
+        sqlite_where=_RFC_KEYED,
+        postgresql_where=_RFC_KEYED,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_customers_rfc', table_name='customers')
+    op.drop_index('ux_stock_item', table_name='stock')
+    op.create_index('idx_stock_item', 'stock', ['item'], unique=False)
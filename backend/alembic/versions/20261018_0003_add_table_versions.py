@@ -0,0 +1,29 @@
+"""per-table change counters backing list ETags
+
+Revision ID: 20261018_0003
+Revises: 20261018_0002
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0003'
+down_revision = '20261018_0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=64), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.bulk_insert(table, [{'table_name': t, 'version': 0} for t in ('quotes', 'work_orders', 'stock')])
+
+
+def downgrade() -> None:
+    op.drop_table('table_versions')
@@ -0,0 +1,35 @@
+"""store users.email lowercased so lookups use ix_users_email
+
+Revision ID: 20261018_0004
+Revises: 20261018_0003
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0004'
+down_revision = '20261018_0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    clashes = conn.execute(
+        sa.text(
+            "SELECT lower(trim(email)) FROM users GROUP BY lower(trim(email)) HAVING count(*) > 1"
+        )
+    ).scalars().all()
+    if clashes:
+        raise RuntimeError(
+            "users.email differs only by case for: " + ", ".join(clashes) + "; merge them before upgrading"
+        )
+    op.execute("UPDATE users SET email = lower(trim(email)) WHERE email <> lower(trim(email))")
+
+
+def downgrade() -> None:
+    # Lowercasing is not reversible and stays valid for the old case-insensitive lookups
+    pass
@@ -0,0 +1,40 @@
+"""email outbox drained by the background SMTP sender
+
+Revision ID: 20261018_0005
+Revises: 20261018_0004
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0005'
+down_revision = '20261018_0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('recipient', sa.String(length=255), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('locked_by', sa.String(length=32), nullable=True),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('idx_email_outbox_due', 'email_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_email_outbox_due', table_name='email_outbox')
+    op.drop_table('email_outbox')
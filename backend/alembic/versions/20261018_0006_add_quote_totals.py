@@ -0,0 +1,44 @@
+"""quote subtotal and tax_total maintained from quote_items
+
+Revision ID: 20261018_0006
+Revises: 20261018_0005
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0006'
+down_revision = '20261018_0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quotes', sa.Column('subtotal', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('quotes', sa.Column('tax_total', sa.Float(), nullable=False, server_default='0'))
+    # Quotes without items keep the total typed by the client
+    op.execute(
+        "UPDATE quotes SET subtotal = total "
+        "WHERE NOT EXISTS (SELECT 1 FROM quote_items i WHERE i.quote_id = quotes.id)"
+    )
+    # tax_rate is a percentage (16.0 = 16 %)
+    op.execute(
+        """
+        UPDATE quotes SET
+            subtotal = (SELECT SUM(i.qty * i.unit_price) FROM quote_items i WHERE i.quote_id = quotes.id),
+            tax_total = (SELECT SUM(i.qty * i.unit_price * i.tax_rate / 100.0) FROM quote_items i WHERE i.quote_id = quotes.id)
+        WHERE EXISTS (SELECT 1 FROM quote_items i WHERE i.quote_id = quotes.id)
+        """
+    )
+    op.execute(
+        "UPDATE quotes SET total = subtotal + tax_total "
+        "WHERE EXISTS (SELECT 1 FROM quote_items i WHERE i.quote_id = quotes.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('quotes', 'tax_total')
+    op.drop_column('quotes', 'subtotal')
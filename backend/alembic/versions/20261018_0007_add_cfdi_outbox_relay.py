@@ -0,0 +1,26 @@
+"""cfdi_pending as a transactional outbox: published_at for the relay
+
+Revision ID: 20261018_0007
+Revises: 20261018_0006
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0007'
+down_revision = '20261018_0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('cfdi_pending', sa.Column('published_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('idx_cfdi_pending_relay', 'cfdi_pending', ['status', 'published_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_cfdi_pending_relay', table_name='cfdi_pending')
+    op.drop_column('cfdi_pending', 'published_at')
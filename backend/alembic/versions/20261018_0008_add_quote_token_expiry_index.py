@@ -0,0 +1,23 @@
+"""index pending quotes by token expiry for the expiry sweeper
+
+Revision ID: 20261018_0008
+Revises: 20261018_0007
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0008'
+down_revision = '20261018_0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_quotes_token_expiry', 'quotes', ['status', 'token_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_quotes_token_expiry', table_name='quotes')
@@ -0,0 +1,43 @@
+"""quote_rollups: quotes per creation day, customer and status for /quotes/summary
+
+Revision ID: 20261018_0009
+Revises: 20261018_0008
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0009'
+down_revision = '20261018_0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'quote_rollups',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('customer', sa.String(length=255), primary_key=True),
+        sa.Column('status', sa.String(length=32), primary_key=True),
+        sa.Column('quote_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Float(), nullable=False, server_default='0'),
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        day = "COALESCE((created_at AT TIME ZONE 'UTC')::date, CURRENT_DATE)"
+    else:
+        day = "COALESCE(date(created_at), date('now'))"
+    op.execute(
+        f"""
+        INSERT INTO quote_rollups (day, customer, status, quote_count, total)
+        SELECT {day}, customer, status, COUNT(*), SUM(total)
+        FROM quotes
+        GROUP BY {day}, customer, status
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('quote_rollups')
@@ -0,0 +1,49 @@
+"""cfdi columns the models use but no migration created (rfc, cfdi_use, status)
+
+Until now only SQLite's create_all produced them, so a migrated database
+failed on the first CFDI draft.
+
+Revision ID: 20261018_0010
+Revises: 20261018_0009
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261018_0010'
+down_revision = '20261018_0009'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set[str]:
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    # Databases first built by create_all already have them
+    pending = _columns('cfdi_pending')
+    if 'rfc' not in pending:
+        op.add_column(
+            'cfdi_pending',
+            sa.Column('rfc', sa.String(length=64), nullable=False, server_default='XAXX010101000'),
+        )
+    if 'cfdi_use' not in pending:
+        op.add_column(
+            'cfdi_pending',
+            sa.Column('cfdi_use', sa.String(length=8), nullable=False, server_default='P01'),
+        )
+    if 'status' not in _columns('cfdi_documents'):
+        op.add_column(
+            'cfdi_documents',
+            sa.Column('status', sa.String(length=16), nullable=False, server_default='sent'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('cfdi_documents', 'status')
+    op.drop_column('cfdi_pending', 'cfdi_use')
+    op.drop_column('cfdi_pending', 'rfc')
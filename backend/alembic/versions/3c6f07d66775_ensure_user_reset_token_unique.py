@@ -20,13 +20,17 @@ def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
     op.drop_index('ix_quotes_token', table_name='quotes')
     op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
-    op.create_unique_constraint(None, 'users', ['reset_token'])
+    # Batch mode so SQLite (no ALTER of constraints) recreates the table; the
+    # name is the one Postgres gave the unnamed constraint
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.create_unique_constraint('users_reset_token_key', ['reset_token'])
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_constraint(None, 'users', type_='unique')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('users_reset_token_key', type_='unique')
     op.drop_index(op.f('ix_users_email'), table_name='users')
     op.create_index('ix_quotes_token', 'quotes', ['token'], unique=1)
     # ### end Alembic commands ###
@@ -74,7 +74,12 @@ def upgrade() -> None:
         sa.Column("last_check", sa.DateTime(timezone=True), nullable=True),
     )
 
-    op.add_column("quotes", sa.Column("customer_id", sa.Integer(), sa.ForeignKey("customers.id", ondelete="SET NULL"), nullable=True))
+    # Batch mode: SQLite cannot ALTER TABLE ADD a foreign key constraint
+    with op.batch_alter_table("quotes") as batch_op:
+        batch_op.add_column(sa.Column("customer_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "quotes_customer_id_fkey", "customers", ["customer_id"], ["id"], ondelete="SET NULL"
+        )
     op.create_index("idx_quotes_customer", "quotes", ["customer_id"], unique=False)
     op.create_index("ux_quotes_approval_token", "quotes", ["token"], unique=True)
 
@@ -82,7 +87,9 @@ def upgrade() -> None:
 def downgrade() -> None:
     op.drop_index("ux_quotes_approval_token", table_name="quotes")
     op.drop_index("idx_quotes_customer", table_name="quotes")
-    op.drop_column("quotes", "customer_id")
+    with op.batch_alter_table("quotes") as batch_op:
+        batch_op.drop_constraint("quotes_customer_id_fkey", type_="foreignkey")
+        batch_op.drop_column("customer_id")
 
     op.drop_table("license_state")
     op.drop_index("idx_attachments_wo", table_name="attachments")
@@ -0,0 +1,157 @@
+"""Negative-lookup set of approval tokens for the public approval endpoints.
+
+``/quotes/approve-check`` and ``/quotes/approve-confirm`` are unauthenticated,
+so guessed or garbage tokens must not each cost a database query. This module
+keeps every known token with the time after which it can be forgotten (its
+expiry plus ``APPROVAL_TOKEN_RETENTION_DAYS``, so expired tokens still get
+``410 token_expired`` for a while). A token missing from the set is rejected
+without touching the database; a present one still goes to the database.
+
+The set is a Redis sorted set shared by all workers, rebuilt from ``quotes``
+at startup and extended on every quote creation. It is only used with
+``REDIS_URL`` pointing at a reachable Redis: a per-process set (or the
+fakeredis fallback of ``get_redis``) would miss tokens created by other
+workers and wrongly reject them. Without it, until a rebuild has run, or
+after a token could not be added, ``known`` answers ``None`` and callers
+fall back to the database.
+"""
+import logging
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from .models import QuoteORM
+from .redis_conn import get_redis, is_shared
+
+logger = logging.getLogger(__name__)
+
+APPROVAL_TOKEN_FILTER = os.getenv("APPROVAL_TOKEN_FILTER", "1").lower() in ("1", "true", "yes")
+APPROVAL_TOKEN_RETENTION_DAYS = int(os.getenv("APPROVAL_TOKEN_RETENTION_DAYS", "30"))
+
+_KEY = "quotes:approval_tokens"
+_READY_KEY = "quotes:approval_tokens:ready"
+_PRUNE_SECONDS = 300
+_REBUILD_CHUNK = 1000
+
+LOOKUPS = Counter(
+    "approval_token_filter_total",
+    "Approval token lookups answered by the Redis token set",
+    ["result"],
+)
+
+
+def _forget_at(expires_at: datetime | None) -> float:
+    if expires_at is None:
+        return math.inf
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return (expires_at + timedelta(days=APPROVAL_TOKEN_RETENTION_DAYS)).timestamp()
+
+
+class RedisStore:
+    def __init__(self, client) -> None:
+        self.client = client
+        # Cleared when this process failed to add a token, until the next rebuild
+        self._trusted = True
+
+    def add_many(self, entries: list[tuple[str, float]]) -> None:
+        # Only ever adds: a rebuild racing with new quotes in other workers cannot drop them
+        pipe = self.client.pipeline(transaction=False)
+        for i in range(0, len(entries), _REBUILD_CHUNK):
+            pipe.zadd(_KEY, dict(entries[i : i + _REBUILD_CHUNK]))
+        pipe.execute()
+
+    def mark_ready(self) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zremrangebyscore(_KEY, "-inf", time.time())
+        pipe.set(_READY_KEY, "1")
+        pipe.execute()
+        self._trusted = True
+
+    def mark_not_ready(self) -> None:
+        self._trusted = False
+        try:
+            # Other workers stop trusting the set too, if Redis still answers
+            self.client.delete(_READY_KEY)
+        except Exception:
+            pass
+
+    def known(self, token: str) -> bool | None:
+        if not self._trusted:
+            return None
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(_READY_KEY)
+        pipe.zscore(_KEY, token)
+        ready, forget_at = pipe.execute()
+        if not ready:
+            return None
+        return forget_at is not None and forget_at > time.time()
+
+
+_UNSET = object()
+
+# Resolved on first use, not at import
+_store = _UNSET
+
+
+def store() -> RedisStore | None:
+    """The shared token set, or ``None`` when no real Redis is configured."""
+    global _store
+    if _store is _UNSET:
+        client = get_redis() if os.getenv("REDIS_URL") else None
+        _store = RedisStore(client) if is_shared(client) else None
+    return _store
+
+
+def rebuild(db: Session) -> int:
+    """Load every token that is not past retention; returns how many were loaded."""
+    target = store()
+    if target is None:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=APPROVAL_TOKEN_RETENTION_DAYS)
+    stmt = select(QuoteORM.token, QuoteORM.token_expires_at).where(
+        or_(QuoteORM.token_expires_at.is_(None), QuoteORM.token_expires_at > cutoff)
+    )
+    loaded = 0
+    for chunk in db.execute(stmt.execution_options(yield_per=_REBUILD_CHUNK)).partitions():
+        target.add_many([(token, _forget_at(expires_at)) for token, expires_at in chunk])
+        loaded += len(chunk)
+    target.mark_ready()
+    return loaded
+
+
+def remember(token: str, expires_at: datetime | None) -> None:
+    """Register a new token; call after the quote is committed.
+
+    Never raises: the quote already exists, so on a Redis error the set stops
+    answering and lookups go to the database until the next rebuild.
+    """
+    target = store() if APPROVAL_TOKEN_FILTER else None
+    if target is None:
+        return
+    try:
+        target.add_many([(token, _forget_at(expires_at))])
+    except Exception as exc:
+        logger.warning("approval token not added to the set: %s", exc)
+        target.mark_not_ready()
+
+
+async def known(token: str) -> bool | None:
+    """``False`` if the token certainly does not exist, ``None`` if the set cannot tell."""
+    if not APPROVAL_TOKEN_FILTER:
+        return None
+    target = store()
+    if target is None:
+        return None
+    try:
+        result = await run_in_threadpool(target.known, token)
+    except Exception:
+        result = None
+    LOOKUPS.labels(result={True: "hit", False: "miss", None: "unknown"}[result]).inc()
+    return result
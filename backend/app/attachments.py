@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_async_read_db, get_db
 from .models import AttachmentORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
 
 
 router = APIRouter(prefix="/attachments", tags=["attachments"])
@@ -27,12 +29,16 @@ class Attachment(BaseModel):
 
 
 @router.get("/", response_model=list[Attachment])
-def list_attachments(
-    db: Session = Depends(get_db),
+async def list_attachments(
+    work_order_id: str | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    rows = db.query(AttachmentORM).all()
-    return [Attachment(id=r.id, work_order_id=r.work_order_id, s3_key=r.s3_key) for r in rows]
+    stmt = project(Attachment, AttachmentORM)
+    if work_order_id is not None:
+        stmt = stmt.where(AttachmentORM.work_order_id == work_order_id)
+    return await paginate_json(db, Attachment, stmt, AttachmentORM.id, page)
 
 
 @router.post("/", response_model=Attachment)
@@ -1,22 +1,36 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
+import hashlib
 import logging
 import os
-import bcrypt
+import threading
+import time
 
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, EmailStr
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
-from .db import get_db
-from .models import UserORM, RoleORM
-from .email import send_email
+from prometheus_client import Counter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy import select
+from .db import get_async_db, get_db
+from .models import UserORM, RoleORM, normalize_email
+from .email import queue_email
+from . import password_pool, revocation
+from .ratelimit import rate_limit
+from .password_pool import hash_password, verify_password
 
 SECRET = os.getenv("JWT_SECRET", "dev_secret_change_me")
 ALGO = os.getenv("JWT_ALGO", "HS256")
+# Verified-claims cache for require_roles/require_auth; size 0 disables it
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+JWT_CACHE_TTL_SECONDS = int(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+# Login attempts per email and period, shared across workers when Redis is set
+LOGIN_RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", "10"))
+LOGIN_RATE_PERIOD_SECONDS = int(os.getenv("LOGIN_RATE_PERIOD_SECONDS", "60"))
 
 ROLE_MATRIX: dict[str, str] = {
     "admin": "Gestión completa y operaciones críticas",
@@ -63,6 +77,7 @@ def _build_claims(sub: str, roles: list[str], expires: timedelta) -> dict:
         "roles": roles,
         "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
+        "gen": revocation.generation(sub),
     }
 
 
@@ -74,23 +89,66 @@ def create_access_token(sub: str, roles: list[str], expires: timedelta | None =
     return token, claims["exp"]
 
 
+def _check_revoked(claims: dict) -> None:
+    gen = claims.get("gen", 0)
+    if revocation.is_revoked(claims.get("sub"), gen if isinstance(gen, int) else 0):
+        raise HTTPException(status_code=401, detail="token_revoked")
+
+
 def decode_access_token(token: str) -> dict:
     """Decode and validate a JWT, returning its claims."""
     try:
         claims = jwt.decode(token, SECRET, algorithms=[ALGO])
     except JWTError as exc:
         raise HTTPException(status_code=401, detail="invalid_token") from exc
+    _check_revoked(claims)
     roles = claims.get("roles")
     if not isinstance(roles, list):
         claims["roles"] = []
     return claims
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+JWT_CACHE_LOOKUPS = Counter("jwt_cache_lookups_total", "Verified-JWT cache lookups", ["result"])
+
+# digest -> (claims, expires_at monotonic)
+_claims_cache: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+_claims_lock = threading.Lock()
+
+
+def verify_token(token: str) -> dict:
+    """``decode_access_token`` behind a bounded LRU/TTL cache of verified claims.
+
+    Entries live at most ``JWT_CACHE_TTL_SECONDS`` and never past the token's
+    ``exp``; only tokens that verified successfully are cached.
+    """
+    if JWT_CACHE_SIZE <= 0:
+        return decode_access_token(token)
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.monotonic()
+    with _claims_lock:
+        entry = _claims_cache.get(key)
+        hit = entry is not None and entry[1] > now
+        if hit:
+            _claims_cache.move_to_end(key)
+    if hit:
+        JWT_CACHE_LOOKUPS.labels(result="hit").inc()
+        claims = dict(entry[0])
+        # Revocation is checked on every hit: a revoked token stops working at once
+        _check_revoked(claims)
+        return claims
+    JWT_CACHE_LOOKUPS.labels(result="miss").inc()
+    claims = decode_access_token(token)
+    ttl = JWT_CACHE_TTL_SECONDS
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        with _claims_lock:
+            _claims_cache[key] = (dict(claims), now + ttl)
+            _claims_cache.move_to_end(key)
+            while len(_claims_cache) > JWT_CACHE_SIZE:
+                _claims_cache.popitem(last=False)
+    return claims
 
 
 bearer = HTTPBearer(auto_error=False)
@@ -103,7 +161,7 @@ def require_roles(required: list[str]):
         if not credentials:
             raise HTTPException(status_code=401, detail="unauthorized")
         token = credentials.credentials
-        claims = decode_access_token(token)
+        claims = verify_token(token)
         roles = claims.get("roles", [])
         if not any(r in roles for r in required):
             raise HTTPException(status_code=403, detail="forbidden")
@@ -117,15 +175,68 @@ def require_auth(credentials: HTTPAuthorizationCredentials = Depends(bearer)):
     if not credentials:
         raise HTTPException(status_code=401, detail="unauthorized")
     token = credentials.credentials
-    return decode_access_token(token)
+    return verify_token(token)
+
+
+def _user_with_roles(email: str):
+    """User lookup with its roles joined in, so auth paths make one round trip."""
+    return (
+        select(UserORM)
+        .where(UserORM.email == normalize_email(email))
+        .options(joinedload(UserORM.roles))
+    )
+
+
+# Catálogo en proceso nombre -> id; solo roles ya confirmados en la base
+_role_ids: dict[str, int] = {}
+
+
+def _roles_by_name(db: Session, names: list[str]) -> list[RoleORM]:
+    """RoleORM instances for ``names``, creating the missing ones.
+
+    Known roles are attached from the catalog via ``merge(load=False)``
+    without querying; unknown names are loaded in a single ``IN`` query.
+    Roles created here enter the catalog the next time they are loaded, so a
+    rolled-back creation never leaves a dangling id behind.
+    """
+    missing = [name for name in dict.fromkeys(names) if name not in _role_ids]
+    found: dict[str, RoleORM] = {}
+    if missing:
+        for role in db.execute(select(RoleORM).where(RoleORM.name.in_(missing))).scalars():
+            _role_ids[role.name] = role.id
+            found[role.name] = role
+    roles: list[RoleORM] = []
+    for name in dict.fromkeys(names):
+        role = found.get(name)
+        if role is None and name in _role_ids:
+            ref = RoleORM(id=_role_ids[name], name=name)
+            make_transient_to_detached(ref)
+            role = db.merge(ref, load=False)
+        if role is None:
+            role = RoleORM(name=name)
+            db.add(role)
+            found[name] = role
+        roles.append(role)
+    return roles
+
+
+def _login_email(payload: LoginRequest) -> str:
+    # Keyed by account, not IP: the BFF proxies every client from one address
+    return normalize_email(payload.email)
 
 
 @router.post("/login", response_model=LoginResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(
+    payload: LoginRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _limit: None = Depends(
+        rate_limit("login", limit=LOGIN_RATE_LIMIT, period=LOGIN_RATE_PERIOD_SECONDS, key=_login_email)
+    ),
+):
     logger.info("login attempt for %s", payload.email)
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
-    user = db.execute(stmt).scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    user = (await db.execute(_user_with_roles(payload.email))).unique().scalar_one_or_none()
+    # bcrypt is CPU-bound: keep it off the event loop and the shared threadpool
+    if not user or not await password_pool.run(verify_password, payload.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="invalid_credentials")
     roles = [r.name for r in user.roles]
     token, exp = create_access_token(payload.email, roles)
@@ -135,26 +246,19 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 @router.post("/signup", response_model=LoginResponse, status_code=201)
 def signup(payload: SignupRequest, db: Session = Depends(get_db)):
     logger.info("signup attempt for %s", payload.email)
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
+    stmt = select(UserORM).where(UserORM.email == normalize_email(payload.email))
     existing = db.execute(stmt).scalar_one_or_none()
     if existing:
         raise HTTPException(status_code=400, detail="user_exists")
-    desired_roles = payload.roles or ["user"]
-    role_objs: list[RoleORM] = []
-    for name in desired_roles:
-        role = db.execute(select(RoleORM).where(RoleORM.name == name)).scalar_one_or_none()
-        if not role:
-            role = RoleORM(name=name)
-            db.add(role)
-        role_objs.append(role)
+    role_objs = _roles_by_name(db, payload.roles or ["user"])
     user = UserORM(
-        email=payload.email.lower(),
-        hashed_password=hash_password(payload.password),
+        email=payload.email,
+        hashed_password=password_pool.run_sync(hash_password, payload.password),
         roles=role_objs,
     )
     db.add(user)
-    db.commit()
     roles = [r.name for r in user.roles]
+    db.commit()
     token, exp = create_access_token(payload.email, roles)
     return LoginResponse(access_token=token, exp=exp, roles=roles)
 
@@ -171,8 +275,7 @@ def refresh(
     sub = claims.get("sub", "")
     roles: list[str] = []
     if sub:
-        stmt = select(UserORM).where(func.lower(UserORM.email) == sub.lower())
-        user = db.execute(stmt).scalar_one_or_none()
+        user = db.execute(_user_with_roles(sub)).unique().scalar_one_or_none()
         if user:
             roles = [r.name for r in user.roles]
     if not roles:
@@ -193,18 +296,16 @@ def add_role(
     db: Session = Depends(get_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
-    user = db.execute(stmt).scalar_one_or_none()
+    user = db.execute(_user_with_roles(payload.email)).unique().scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
-    role = db.execute(select(RoleORM).where(RoleORM.name == payload.role)).scalar_one_or_none()
-    if not role:
-        role = RoleORM(name=payload.role)
-        db.add(role)
+    (role,) = _roles_by_name(db, [payload.role])
     if role not in user.roles:
         user.roles.append(role)
+    # Read before commit: expire_on_commit would reload the user and its roles
+    roles = [r.name for r in user.roles]
     db.commit()
-    return RolesResponse(roles=[r.name for r in user.roles])
+    return RolesResponse(roles=roles)
 
 
 @router.delete("/roles", response_model=RolesResponse)
@@ -213,15 +314,18 @@ def remove_role(
     db: Session = Depends(get_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
-    user = db.execute(stmt).scalar_one_or_none()
+    user = db.execute(_user_with_roles(payload.email)).unique().scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
-    role = db.execute(select(RoleORM).where(RoleORM.name == payload.role)).scalar_one_or_none()
-    if role and role in user.roles:
+    role = next((r for r in user.roles if r.name == payload.role), None)
+    if role is not None:
         user.roles.remove(role)
+    roles = [r.name for r in user.roles]
     db.commit()
-    return RolesResponse(roles=[r.name for r in user.roles])
+    if role is not None:
+        # Tokens already issued still carry the removed role
+        revocation.revoke_user(user.email)
+    return RolesResponse(roles=roles)
 
 
 class ForgotPasswordRequest(BaseModel):
@@ -231,16 +335,17 @@ class ForgotPasswordRequest(BaseModel):
 @router.post("/forgot-password")
 def forgot_password(payload: ForgotPasswordRequest, db: Session = Depends(get_db)):
     logger.info("forgot password for %s", payload.email)
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
+    stmt = select(UserORM).where(UserORM.email == normalize_email(payload.email))
     user = db.execute(stmt).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
     token = uuid4().hex
     user.reset_token = token
     user.reset_expires = datetime.now(timezone.utc) + timedelta(hours=1)
-    db.commit()
     link = f"https://example.com/reset-password/{token}"
-    send_email(user.email, "Password reset", f"Reset link: {link}")
+    # Se envía desde el outbox en segundo plano, en la misma transacción que el token
+    queue_email(db, user.email, "Password reset", f"Reset link: {link}")
+    db.commit()
     return {"message": "ok"}
 
 
@@ -261,10 +366,11 @@ def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db))
         expires = expires.replace(tzinfo=timezone.utc)
     if expires < datetime.now(timezone.utc):
         raise HTTPException(status_code=400, detail="invalid_token")
-    user.hashed_password = hash_password(payload.password)
+    user.hashed_password = password_pool.run_sync(hash_password, payload.password)
     user.reset_token = None
     user.reset_expires = None
     db.commit()
+    revocation.revoke_user(user.email)
     return {"message": "password_reset"}
 
 
@@ -275,7 +381,7 @@ class VerifyEmailRequest(BaseModel):
 @router.post("/verify-email")
 def verify_email(payload: VerifyEmailRequest, db: Session = Depends(get_db)):
     logger.info("verify email for %s", payload.email)
-    stmt = select(UserORM).where(func.lower(UserORM.email) == payload.email.lower())
+    stmt = select(UserORM).where(UserORM.email == normalize_email(payload.email))
     user = db.execute(stmt).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="user_not_found")
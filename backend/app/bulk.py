@@ -0,0 +1,183 @@
+"""Bulk upsert helpers shared by the catalog routers (stock, customers, vehicles).
+
+Rows arrive as a JSON array or as an NDJSON stream (``Content-Type:
+application/x-ndjson``), are validated one by one and written in batches with a
+single multi-row ``INSERT ... ON CONFLICT DO UPDATE`` keyed on the natural key.
+An update only overwrites the fields present in the row, so omitted optional
+fields keep their stored value.
+"""
+import json
+from typing import Any, AsyncIterator, Callable, Literal
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BULK_BATCH_SIZE = 500
+
+
+class BulkRowResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    id: int | None = None
+    detail: str | None = None
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    errors: int = 0
+    results: list[BulkRowResult] = []
+
+
+async def iter_rows(request: Request) -> AsyncIterator[Any]:
+    """Yield raw rows from a JSON array body or an NDJSON stream."""
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _loads(line)
+        if pending.strip():
+            yield _loads(pending)
+        return
+    data = _loads(await request.body())
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="invalid_payload")
+    for row in data:
+        yield row
+
+
+def _loads(raw: bytes) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid_payload") from exc
+
+
+def _insert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+class BulkUpserter:
+    """Validate, batch and upsert rows of ``orm`` keyed on the ``key`` column.
+
+    ``index_where`` must match the partial unique index backing ``key``;
+    rows for which ``keyed(row)`` is false are plain inserts.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        schema: type[BaseModel],
+        orm,
+        key: str,
+        index_where=None,
+        keyed: Callable[[dict], bool] = lambda row: True,
+    ) -> None:
+        self.db = db
+        self.schema = schema
+        self.table = orm.__table__
+        self.key = key
+        self.index_where = index_where
+        self.keyed = keyed
+        self.result = BulkResult()
+        # (index, row with defaults for the insert, fields given for the update)
+        self._batch: list[tuple[int, dict, frozenset]] = []
+        self._batch_keys: set = set()
+
+    async def run(self, rows: AsyncIterator[Any]) -> BulkResult:
+        index = 0
+        async for raw in rows:
+            try:
+                model = self.schema.model_validate(raw)
+            except ValidationError as exc:
+                self._record(index, "error", detail=exc.errors()[0]["msg"])
+            else:
+                row = model.model_dump()
+                key = row[self.key] if self.keyed(row) else None
+                # The same key twice in one statement is rejected by ON CONFLICT
+                if key is not None and key in self._batch_keys:
+                    await self._flush()
+                self._batch.append((index, row, frozenset(model.model_dump(exclude_unset=True))))
+                if key is not None:
+                    self._batch_keys.add(key)
+                if len(self._batch) >= BULK_BATCH_SIZE:
+                    await self._flush()
+            index += 1
+        await self._flush()
+        self.result.results.sort(key=lambda r: r.index)
+        return self.result
+
+    def _record(self, index: int, status: str, id: int | None = None, detail: str | None = None) -> None:
+        self.result.results.append(BulkRowResult(index=index, status=status, id=id, detail=detail))
+        if status == "error":
+            self.result.errors += 1
+        elif status == "created":
+            self.result.created += 1
+        else:
+            self.result.updated += 1
+
+    async def _flush(self) -> None:
+        batch, self._batch, self._batch_keys = self._batch, [], set()
+        if not batch:
+            return
+        try:
+            outcomes = await self._write(batch)
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            # Slow path: isolate the offending rows one statement at a time
+            outcomes = []
+            for item in batch:
+                try:
+                    outcomes.extend(await self._write([item]))
+                    await self.db.commit()
+                except IntegrityError:
+                    await self.db.rollback()
+                    outcomes.append((item[0], "error", None, "integrity_error"))
+        for index, status, row_id, detail in outcomes:
+            self._record(index, status, id=row_id, detail=detail)
+
+    async def _write(self, batch: list[tuple[int, dict, frozenset]]) -> list[tuple]:
+        key_col = self.table.c[self.key]
+        keyed = [(i, r, f) for i, r, f in batch if self.keyed(r)]
+        plain = [(i, r) for i, r, _ in batch if not self.keyed(r)]
+        outcomes: list[tuple] = []
+        insert = _insert(self.db)
+
+        if keyed:
+            keys = [r[self.key] for _, r, _ in keyed]
+            existing = set((await self.db.execute(select(key_col).where(key_col.in_(keys)))).scalars())
+            # One upsert per distinct set of given fields (usually just one)
+            by_fields: dict[frozenset, list[dict]] = {}
+            for _, row, fields in keyed:
+                by_fields.setdefault(fields, []).append(row)
+            ids = {}
+            for fields, rows in by_fields.items():
+                stmt = insert(self.table).values(rows)
+                # Only the key given: a no-op update still returns the existing id
+                updates = sorted(fields - {self.key}) or [self.key]
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key_col],
+                    index_where=self.index_where,
+                    set_={c: stmt.excluded[c] for c in updates},
+                ).returning(self.table.c.id, key_col)
+                ids.update({k: row_id for row_id, k in (await self.db.execute(stmt)).all()})
+            for index, row, _ in keyed:
+                key = row[self.key]
+                outcomes.append((index, "updated" if key in existing else "created", ids.get(key), None))
+
+        if plain:
+            stmt = insert(self.table).returning(self.table.c.id, sort_by_parameter_order=True)
+            ids = (await self.db.execute(stmt, [r for _, r in plain])).scalars().all()
+            outcomes.extend((index, "created", row_id, None) for (index, _), row_id in zip(plain, ids))
+        return outcomes
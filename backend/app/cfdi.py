@@ -13,7 +13,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from .auth import require_roles
-from .db import get_db
+from .db import get_db, get_read_db
 from .models import CfdiDocumentORM, TaxConfigORM
 from .storage import upload_bytes
 
@@ -134,7 +134,7 @@ def _serve_url(url: str, filename: str, media_type: str):
 
 @router.get("/config", response_model=TaxConfig)
 def get_tax_config(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
     row = db.get(TaxConfigORM, 1)
@@ -198,7 +198,7 @@ def generate_cfdi(
 def download_cfdi(
     cfdi_uuid: str,
     file: str = Query("xml", pattern="^(xml|pdf)$"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
     logger.info("download cfdi %s", cfdi_uuid)
@@ -223,8 +223,10 @@ def process_pending_cfdi(
     db: Session = Depends(get_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    from .cfdi_queue import process_cfdi_queue
+    from .cfdi_queue import process_cfdi_queue, relay_outbox
     try:
+        # Publish outbox rows the background relay has not picked up yet
+        relay_outbox(db)
         processed = process_cfdi_queue(db, limit)
     except Exception as exc:  # pragma: no cover
         logger.exception("error processing cfdi queue: %s", exc)
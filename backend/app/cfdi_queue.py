@@ -1,13 +1,28 @@
+"""CFDI draft queue fed through a transactional outbox.
+
+Approving a quote inserts its ``cfdi_pending`` row in the same commit as the
+status change; nothing is pushed to Redis from the request. ``relay_outbox``
+(run by ``CfdiRelay`` in the API process and before each manual drain) pushes
+rows that were never published, and pushes again rows still ``pending`` long
+after being published, in case the job was lost. Workers claim a row with a
+conditional UPDATE, so a job delivered twice is processed once; a row left in
+``processing`` by a worker that died is reclaimed by the relay after
+``CFDI_PROCESSING_TIMEOUT_SECONDS``.
+"""
 import json
 import os
 import logging
+import threading
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
+from sqlalchemy import case, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .models import CfdiPendingORM, CfdiDocumentORM
+from .redis_conn import get_redis as _get_redis
 from .storage import upload_bytes
 from .cfdi import (
     _build_xml,
@@ -19,49 +34,59 @@ from .cfdi import (
 
 logger = logging.getLogger(__name__)
 
-try:
-    import redis
-except Exception:  # pragma: no cover
-    redis = None
-
-try:
-    import fakeredis
-except Exception:  # pragma: no cover
-    fakeredis = None
-
 _local_queue: list[str] = []
 
 MAX_ATTEMPTS = int(os.getenv("CFDI_MAX_ATTEMPTS", "5"))
+CFDI_RELAY = os.getenv("CFDI_RELAY", "1").lower() in ("1", "true", "yes")
+CFDI_RELAY_BATCH_SIZE = int(os.getenv("CFDI_RELAY_BATCH_SIZE", "100"))
+CFDI_RELAY_POLL_SECONDS = float(os.getenv("CFDI_RELAY_POLL_SECONDS", "1"))
+# A published row still pending after this long is pushed again
+CFDI_REPUBLISH_SECONDS = int(os.getenv("CFDI_REPUBLISH_SECONDS", "300"))
+# A row left in processing this long (worker died mid-job) is handed out again
+CFDI_PROCESSING_TIMEOUT_SECONDS = int(os.getenv("CFDI_PROCESSING_TIMEOUT_SECONDS", "600"))
 
 
-def _get_redis():
-    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    if redis is not None:
-        try:
-            client = redis.from_url(url)
-            client.ping()
-            return client
-        except Exception as exc:  # pragma: no cover
-            logger.warning("redis unavailable: %s", exc)
-    if fakeredis is not None:
-        return fakeredis.FakeStrictRedis()
-    return None
+_UNSET = object()
+
+# Connected on first enqueue/dequeue, not at import
+redis_client = _UNSET
 
 
-redis_client = _get_redis()
+def _client():
+    global redis_client
+    if redis_client is _UNSET:
+        redis_client = _get_redis()
+    return redis_client
 
 
 def _enqueue(job: dict):
     data = json.dumps(job)
-    if redis_client is not None:
-        redis_client.rpush("cfdi_queue", data)
+    client = _client()
+    if client is not None:
+        client.rpush("cfdi_queue", data)
     else:
         _local_queue.append(data)
 
 
+def _enqueue_many(jobs: list[dict]) -> None:
+    if not jobs:
+        return
+    data = [json.dumps(job) for job in jobs]
+    client = _client()
+    if client is not None:
+        # One RPUSH per chunk, all sent in a single round trip
+        pipe = client.pipeline(transaction=False)
+        for i in range(0, len(data), 100):
+            pipe.rpush("cfdi_queue", *data[i : i + 100])
+        pipe.execute()
+    else:
+        _local_queue.extend(data)
+
+
 def _dequeue():
-    if redis_client is not None:
-        item = redis_client.lpop("cfdi_queue")
+    client = _client()
+    if client is not None:
+        item = client.lpop("cfdi_queue")
         if item:
             if isinstance(item, bytes):
                 item = item.decode()
@@ -73,6 +98,30 @@ def _dequeue():
     return None
 
 
+def _new_pending(quote_id: str, customer: str, total: float, rfc: str, cfdi_use: str) -> CfdiPendingORM:
+    return CfdiPendingORM(
+        quote_id=quote_id,
+        customer=customer,
+        total=total,
+        rfc=validate_rfc(rfc),
+        cfdi_use=validate_cfdi_use(cfdi_use),
+    )
+
+
+def add_cfdi_draft(
+    db: Session | AsyncSession,
+    quote_id: str,
+    customer: str,
+    total: float,
+    rfc: str = "XAXX010101000",
+    cfdi_use: str = "P01",
+) -> CfdiPendingORM:
+    """Stage the CFDI draft in the caller's transaction; the relay publishes it."""
+    row = _new_pending(quote_id, customer, total, rfc, cfdi_use)
+    db.add(row)
+    return row
+
+
 def enqueue_cfdi_draft(
     db: Session,
     quote_id: str,
@@ -81,35 +130,139 @@ def enqueue_cfdi_draft(
     rfc: str = "XAXX010101000",
     cfdi_use: str = "P01",
 ) -> str:
-    rfc = validate_rfc(rfc)
-    cfdi_use = validate_cfdi_use(cfdi_use)
-    row = CfdiPendingORM(
-        quote_id=quote_id,
-        customer=customer,
-        total=total,
-        rfc=rfc,
-        cfdi_use=cfdi_use,
-    )
-    db.add(row)
+    """Commit a draft on its own and push it right away.
+
+    For callers outside a request transaction. The row is stamped as published
+    in the same commit; if the push is lost the relay republishes it after
+    ``CFDI_REPUBLISH_SECONDS``.
+    """
+    row = add_cfdi_draft(db, quote_id, customer, total, rfc, cfdi_use)
+    row.published_at = datetime.now(timezone.utc)
     db.commit()
     _enqueue({"pending_id": row.id})
     return row.id
 
 
+def add_cfdi_drafts(
+    db: Session,
+    quotes: list[tuple[str, str, float]],
+    rfc: str = "XAXX010101000",
+    cfdi_use: str = "P01",
+) -> list[str]:
+    """Insert one pending CFDI per ``(quote_id, customer, total)`` in a single statement.
+
+    Does not commit; the relay publishes the rows once the caller commits.
+    """
+    if not quotes:
+        return []
+    rfc, cfdi_use = validate_rfc(rfc), validate_cfdi_use(cfdi_use)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": uuid4().hex,
+            "quote_id": quote_id,
+            "customer": customer,
+            "total": total,
+            "rfc": rfc,
+            "cfdi_use": cfdi_use,
+            "status": "pending",
+            "attempts": 0,
+            "updated_at": now,
+        }
+        for quote_id, customer, total in quotes
+    ]
+    db.execute(insert(CfdiPendingORM).values(rows))
+    return [row["id"] for row in rows]
+
+
+def relay_outbox(db: Session, batch_size: int = CFDI_RELAY_BATCH_SIZE) -> int:
+    """Push due outbox rows to the queue; returns how many were published."""
+    now = datetime.now(timezone.utc)
+    due = or_(
+        (CfdiPendingORM.status == "pending")
+        & or_(
+            CfdiPendingORM.published_at.is_(None),
+            CfdiPendingORM.published_at < now - timedelta(seconds=CFDI_REPUBLISH_SECONDS),
+        ),
+        (CfdiPendingORM.status == "processing")
+        & (CfdiPendingORM.updated_at < now - timedelta(seconds=CFDI_PROCESSING_TIMEOUT_SECONDS)),
+    )
+    batch = select(CfdiPendingORM.id).where(due).order_by(CfdiPendingORM.updated_at).limit(batch_size)
+    # ``due`` repeated outside the subquery so concurrent relays never claim the same row.
+    # Stale processing rows go back to pending, or to failed once out of attempts.
+    claimed = db.execute(
+        update(CfdiPendingORM)
+        .where(CfdiPendingORM.id.in_(batch.scalar_subquery()), due)
+        .values(
+            status=case((CfdiPendingORM.attempts >= MAX_ATTEMPTS, "failed"), else_="pending"),
+            published_at=now,
+        )
+        .returning(CfdiPendingORM.id, CfdiPendingORM.status)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not claimed:
+        db.rollback()
+        return 0
+    try:
+        _enqueue_many([{"pending_id": row.id} for row in claimed if row.status == "pending"])
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
+    return len(claimed)
+
+
+class CfdiRelay:
+    """Background thread running ``relay_outbox`` until stopped."""
+
+    def __init__(self, session_factory, batch_size: int = CFDI_RELAY_BATCH_SIZE) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    published = relay_outbox(db, self.batch_size)
+            except Exception:  # pragma: no cover
+                logger.exception("cfdi outbox relay failed")
+                published = 0
+            if published < self.batch_size:
+                self._stop.wait(CFDI_RELAY_POLL_SECONDS)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="cfdi-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
 def process_cfdi_queue(db: Session, limit: int = 10) -> int:
     processed = 0
     for _ in range(limit):
         job = _dequeue()
         if not job:
             break
-        pending = db.get(CfdiPendingORM, job["pending_id"])
-        if not pending or pending.status != "pending":
-            continue
-        pending.status = "processing"
-        pending.attempts += 1
-        pending.updated_at = datetime.now(timezone.utc)
-        db.add(pending)
+        # Acknowledge by claiming: a duplicate delivery finds the row no longer pending
+        claimed = db.execute(
+            update(CfdiPendingORM)
+            .where(CfdiPendingORM.id == job["pending_id"], CfdiPendingORM.status == "pending")
+            .values(
+                status="processing",
+                attempts=CfdiPendingORM.attempts + 1,
+                updated_at=datetime.now(timezone.utc),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
         db.commit()
+        if not claimed:
+            continue
+        pending = db.get(CfdiPendingORM, job["pending_id"])
         try:
             uuid = uuid4().hex
             item = Item(description="Servicio", quantity=1, unit_price=pending.total)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
-from .models import CustomerORM
+from .db import get_async_db, get_async_read_db, get_db
+from .models import CUSTOMER_RFC_KEYED, GENERIC_RFCS, CustomerORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
+from .bulk import BulkResult, BulkUpserter, iter_rows
 
 
 router = APIRouter(prefix="/customers", tags=["customers"])
@@ -33,15 +37,12 @@ class Customer(BaseModel):
 
 
 @router.get("/", response_model=list[Customer])
-def list_customers(
-    db: Session = Depends(get_db),
+async def list_customers(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    rows = db.query(CustomerORM).all()
-    return [
-        Customer(id=r.id, name=r.name, rfc=r.rfc, email=r.email, phone=r.phone)
-        for r in rows
-    ]
+    return await paginate_json(db, Customer, project(Customer, CustomerORM), CustomerORM.id, page)
 
 
 @router.post("/", response_model=Customer)
@@ -52,11 +53,33 @@ def create_customer(
 ):
     row = CustomerORM(name=payload.name, rfc=payload.rfc, email=payload.email, phone=payload.phone)
     db.add(row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="customer_rfc_exists")
     db.refresh(row)
     return Customer(id=row.id, name=row.name, rfc=row.rfc, email=row.email, phone=row.phone)
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_upsert_customers(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(require_roles(["admin"])),
+):
+    """Alta/actualización masiva por ``rfc``; los RFC genéricos siempre se insertan."""
+    upserter = BulkUpserter(
+        db,
+        CustomerCreate,
+        CustomerORM,
+        key="rfc",
+        index_where=CUSTOMER_RFC_KEYED,
+        keyed=lambda row: row["rfc"] not in GENERIC_RFCS,
+    )
+    return await upserter.run(iter_rows(request))
+
+
 @router.put("/{customer_id}", response_model=Customer)
 def update_customer(
     customer_id: int,
@@ -76,7 +99,11 @@ def update_customer(
     if payload.phone is not None:
         row.phone = payload.phone
     db.add(row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="customer_rfc_exists")
     db.refresh(row)
     return Customer(id=row.id, name=row.name, rfc=row.rfc, email=row.email, phone=row.phone)
 
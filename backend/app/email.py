@@ -1,21 +1,196 @@
+"""Transactional email through an outbox table.
+
+Request handlers only call ``queue_email``, which adds a row to
+``email_outbox`` inside the caller's transaction. ``OutboxSender`` (a
+background thread started from the app lifespan) claims due rows in batches,
+sends them over one reused SMTP connection and retries failures with
+exponential backoff.
+"""
+import logging
 import os
 import smtplib
+import threading
+from datetime import datetime, timedelta, timezone
 from email.message import EmailMessage
+from uuid import uuid4
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from .models import EmailOutboxORM
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_SENDER = os.getenv("EMAIL_OUTBOX_SENDER", "1").lower() in ("1", "true", "yes")
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "2"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_MAX_BACKOFF_SECONDS = int(os.getenv("EMAIL_MAX_BACKOFF_SECONDS", "900"))
+# A row stuck in "sending" longer than this (crashed sender) is claimed again
+EMAIL_LOCK_SECONDS = int(os.getenv("EMAIL_LOCK_SECONDS", "300"))
+
 
+def queue_email(db: Session, to: str, subject: str, body: str) -> EmailOutboxORM:
+    """Stage an email; it is sent only if the caller's transaction commits."""
+    row = EmailOutboxORM(recipient=to, subject=subject, body=body)
+    db.add(row)
+    return row
 
-def send_email(to: str, subject: str, body: str) -> None:
-    host = os.environ.get("SMTP_HOST", "localhost")
-    port = int(os.environ.get("SMTP_PORT", "1025"))
-    sender = os.environ.get("SMTP_SENDER", "noreply@example.com")
 
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _build_message(row: EmailOutboxORM, sender: str) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = sender
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    try:
-        with smtplib.SMTP(host, port) as server:
-            server.send_message(msg)
-    except Exception:
-        print(f"email to {to}: {subject}\n{body}")
+    msg["To"] = row.recipient
+    msg["Subject"] = row.subject
+    msg.set_content(row.body)
+    return msg
+
+
+class OutboxSender:
+    """Drain ``email_outbox`` over a single, reused SMTP connection."""
+
+    def __init__(self, session_factory, batch_size: int = EMAIL_BATCH_SIZE) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.worker_id = uuid4().hex
+        self.host = os.getenv("SMTP_HOST", "localhost")
+        self.port = int(os.getenv("SMTP_PORT", "1025"))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASS")
+        self.sender = os.getenv("SMTP_FROM") or os.getenv("SMTP_SENDER", "noreply@example.com")
+        self._smtp: smtplib.SMTP | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- SMTP connection ---
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+                return self._smtp
+            except smtplib.SMTPException:
+                self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.user:
+            smtp.ehlo()
+            if smtp.has_extn("starttls"):
+                smtp.starttls()
+                smtp.ehlo()
+            smtp.login(self.user, self.password or "")
+        self._smtp = smtp
+        return smtp
+
+    def close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                smtp.close()
+
+    # --- outbox ---
+
+    def _claim(self, db: Session) -> list[EmailOutboxORM]:
+        now = _now()
+        claimable = or_(
+            (EmailOutboxORM.status == "pending") & (EmailOutboxORM.next_attempt_at <= now),
+            (EmailOutboxORM.status == "sending")
+            & (EmailOutboxORM.locked_at < now - timedelta(seconds=EMAIL_LOCK_SECONDS)),
+        )
+        due = (
+            select(EmailOutboxORM.id)
+            .where(claimable)
+            .order_by(EmailOutboxORM.next_attempt_at)
+            .limit(self.batch_size)
+        )
+        # ``claimable`` repeated outside the subquery so two senders never claim the same row
+        db.execute(
+            update(EmailOutboxORM)
+            .where(EmailOutboxORM.id.in_(due.scalar_subquery()), claimable)
+            .values(status="sending", locked_by=self.worker_id, locked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        stmt = select(EmailOutboxORM).where(
+            EmailOutboxORM.locked_by == self.worker_id, EmailOutboxORM.status == "sending"
+        )
+        return list(db.execute(stmt).scalars())
+
+    def _failed(self, row: EmailOutboxORM, exc: Exception) -> None:
+        row.attempts += 1
+        row.last_error = str(exc)[:255]
+        row.locked_by = None
+        if row.attempts >= EMAIL_MAX_ATTEMPTS:
+            row.status = "failed"
+            logger.error("email %s failed after %s attempts: %s", row.id, row.attempts, exc)
+        else:
+            row.status = "pending"
+            delay = min(EMAIL_MAX_BACKOFF_SECONDS, 2 ** row.attempts)
+            row.next_attempt_at = _now() + timedelta(seconds=delay)
+            logger.warning("email %s attempt %s failed: %s", row.id, row.attempts, exc)
+
+    def send_batch(self) -> int:
+        """Send one batch of due messages; returns how many were delivered."""
+        sent = 0
+        with self.session_factory() as db:
+            rows = self._claim(db)
+            if not rows:
+                return 0
+            try:
+                smtp = self._connection()
+            except (OSError, smtplib.SMTPException) as exc:
+                for row in rows:
+                    self._failed(row, exc)
+                db.commit()
+                return 0
+            for i, row in enumerate(rows):
+                try:
+                    smtp.send_message(_build_message(row, self.sender))
+                except smtplib.SMTPServerDisconnected as exc:
+                    self.close()
+                    self._failed(row, exc)
+                    try:
+                        smtp = self._connection()
+                    except (OSError, smtplib.SMTPException) as reconnect_exc:
+                        for rest in rows[i + 1 :]:
+                            self._failed(rest, reconnect_exc)
+                        break
+                except (OSError, smtplib.SMTPException) as exc:
+                    self._failed(row, exc)
+                else:
+                    row.status = "sent"
+                    row.sent_at = _now()
+                    row.locked_by = None
+                    sent += 1
+            db.commit()
+        return sent
+
+    # --- background thread ---
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sent = self.send_batch()
+            except Exception:  # pragma: no cover
+                logger.exception("email outbox sender failed")
+                sent = 0
+            if sent < self.batch_size:
+                # Idle: drop the connection instead of holding it open between polls
+                if not sent:
+                    self.close()
+                self._stop.wait(EMAIL_POLL_SECONDS)
+        self.close()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
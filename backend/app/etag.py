@@ -0,0 +1,100 @@
+"""Conditional GET for the polled lists (quotes, work orders, stock).
+
+Every write to a table in ``VERSIONED_TABLES``, both ORM flushes and
+``INSERT``/``UPDATE``/``DELETE`` statements run through a session, marks the
+table on the session; once the session commits, the marked rows of
+``table_versions`` are bumped in a short transaction of their own. Bumping
+inside the writer's transaction would hold the counter's row lock until that
+commit and serialize every writer of the table. A list's ETag is that counter
+plus a digest of the query string, so answering ``If-None-Match`` with 304
+costs one primary-key lookup and no row data. Writes that bypass the app's
+sessions (raw SQL, manual fixes) do not bump it.
+"""
+import hashlib
+import logging
+from itertools import chain
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .db import engine, get_async_read_db
+from .models import VERSIONED_TABLES, TableVersionORM
+
+logger = logging.getLogger(__name__)
+
+# Deleting a quote nulls work_orders.quote_id through the FK (ON DELETE SET NULL)
+_ALSO_CHANGES = {"quotes": ("work_orders",)}
+_PENDING_KEY = "etag_tables"
+
+
+def _mark(session, tables: set[str]) -> None:
+    tables = {dep for t in tables for dep in (t, *_ALSO_CHANGES.get(t, ()))} & set(VERSIONED_TABLES)
+    if tables:
+        session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_after_flush(session, flush_context) -> None:
+    # new/dirty/deleted still hold the pre-flush state here
+    objects = chain(session.new, session.dirty, session.deleted)
+    _mark(session, {type(obj).__table__.name for obj in objects})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_on_dml(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        _mark(state.session, {state.statement.table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session) -> None:
+    tables = session.info.pop(_PENDING_KEY, None)
+    if not tables:
+        return
+    # After the data commit, so a reader never pairs the new version with old rows
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                update(TableVersionORM)
+                .where(TableVersionORM.table_name.in_(sorted(tables)))
+                .values(version=TableVersionORM.version + 1)
+            )
+    except Exception as exc:
+        # The write is committed; clients only miss it until the next bump
+        logger.warning("table_versions not bumped for %s: %s", sorted(tables), exc)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def table_version(db: AsyncSession, table: str) -> int | None:
+    stmt = select(TableVersionORM.version).where(TableVersionORM.table_name == table)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def conditional(table: str):
+    """Dependency: 304 when ``If-None-Match`` matches, else the ETag to send."""
+
+    async def dependency(request: Request, db: AsyncSession = Depends(get_async_read_db)) -> str | None:
+        version = await table_version(db, table)
+        if version is None:
+            return None
+        digest = hashlib.blake2s(request.url.query.encode(), digest_size=6).hexdigest()
+        etag = f'W/"{table}-{version}-{digest}"'
+        if _matches(request, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        return etag
+
+    return dependency
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from .auth import require_roles
+from .db import ReadSessionLocal, SessionLocal
+from .models import CfdiDocumentORM, InvoiceORM, QuoteORM, StockORM
+
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+logger = logging.getLogger(__name__)
+
+# Filas por lote leídas del cursor del servidor y escritas en cada chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORTS = {
+    "invoices": (InvoiceORM.id, [InvoiceORM.id, InvoiceORM.customer, InvoiceORM.total, InvoiceORM.created_at]),
+    "cfdi_documents": (
+        CfdiDocumentORM.uuid,
+        [
+            CfdiDocumentORM.uuid,
+            CfdiDocumentORM.customer,
+            CfdiDocumentORM.total,
+            CfdiDocumentORM.status,
+            CfdiDocumentORM.xml_url,
+            CfdiDocumentORM.pdf_url,
+            CfdiDocumentORM.created_at,
+        ],
+    ),
+    "quotes": (
+        QuoteORM.id,
+        [
+            QuoteORM.id,
+            QuoteORM.customer,
+            QuoteORM.customer_id,
+            QuoteORM.subtotal,
+            QuoteORM.tax_total,
+            QuoteORM.total,
+            QuoteORM.status,
+            QuoteORM.created_at,
+        ],
+    ),
+    "stock": (StockORM.id, [StockORM.id, StockORM.item, StockORM.quantity, StockORM.unit_price]),
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _iter_export(table: str, fmt: str) -> Iterator[str]:
+    """Yield the export body in chunks, reading rows through a server-side cursor.
+
+    Opens its own session (on the read replica when configured): the
+    request-scoped one from ``get_db`` is closed before a streaming body
+    starts being sent.
+    """
+    key, columns = EXPORTS[table]
+    names = [c.key for c in columns]
+    stmt = select(*columns).order_by(key).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    with (ReadSessionLocal or SessionLocal)() as db:
+        result = db.execute(stmt)
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(names)
+            for batch in result.partitions():
+                writer.writerows([[_plain(v) for v in row] for row in batch])
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.getvalue():
+                yield buf.getvalue()
+        else:
+            for batch in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(names, map(_plain, row)))) + "\n" for row in batch
+                )
+
+
+@router.get("/{table}")
+def export_table(
+    table: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    claims: dict = Depends(require_roles(["admin"])),
+):
+    if table not in EXPORTS:
+        raise HTTPException(status_code=404, detail="export_not_found")
+    logger.info("export %s as %s", table, format)
+    return StreamingResponse(
+        _iter_export(table, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
@@ -1,12 +1,14 @@
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from .db import get_db
+from .db import get_async_read_db, get_db, get_read_db
 from .models import InvoiceORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
@@ -29,15 +31,22 @@ class Invoice(BaseModel):
 
 
 @router.get("/", response_model=list[Invoice])
-def list_invoices(
-    db: Session = Depends(get_db),
+async def list_invoices(
+    customer: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    rows = db.query(InvoiceORM).all()
-    return [
-        Invoice(id=r.id, customer=r.customer, total=r.total, created_at=r.created_at)
-        for r in rows
-    ]
+    stmt = project(Invoice, InvoiceORM)
+    if customer is not None:
+        stmt = stmt.where(InvoiceORM.customer == customer)
+    if created_from is not None:
+        stmt = stmt.where(InvoiceORM.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(InvoiceORM.created_at < created_to)
+    return await paginate_json(db, Invoice, stmt, InvoiceORM.id, page)
 
 
 @router.post("/", response_model=Invoice)
@@ -56,7 +65,7 @@ def create_invoice(
 @router.get("/{invoice_id}", response_model=Invoice)
 def get_invoice(
     invoice_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
     row = db.get(InvoiceORM, invoice_id)
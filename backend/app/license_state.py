@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_db, get_read_db
 from .models import LicenseStateORM
 from .auth import require_roles
 
@@ -30,7 +30,7 @@ class LicenseState(BaseModel):
 
 @router.get("/", response_model=list[LicenseState])
 def list_states(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
     rows = db.query(LicenseStateORM).all()
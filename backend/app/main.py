@@ -2,26 +2,39 @@ import json
 import logging
 import os
 
-from fastapi import FastAPI, Request, Response
+# Imported first so its clock covers the rest of the API boot
+from . import startup_profile
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Literal
 from contextlib import asynccontextmanager
 
 from prometheus_client import Counter, CONTENT_TYPE_LATEST, generate_latest
 
-from . import auth as auth_router
-from . import quotes as quotes_router
-from . import cfdi as cfdi_router
-from . import billing as billing_router
-from . import stock as stock_router
-from . import invoice as invoice_router
-from . import customers as customers_router
-from . import vehicles as vehicles_router
-from . import quote_items as quote_items_router
-from . import work_orders as work_orders_router
-from . import attachments as attachments_router
-from . import license_state as license_state_router
-from .db import Base, engine, DATABASE_URL
+startup_profile.timed_import(".db", __package__)
+from .db import (
+    Base,
+    SessionLocal,
+    engine,
+    DATABASE_URL,
+    DATABASE_READ_URL,
+    DB_SCHEMA_CHECK,
+    get_schema_revisions,
+    note_write,
+    register_pool_metrics,
+    writer_key,
+)
+# Timed like .db so the profile still attributes what they pull in (auth
+# loads email, password_pool, revocation and ratelimit)
+for _name in ("auth", "approval_tokens", "cfdi_queue", "quote_expiry"):
+    startup_profile.timed_import(f".{_name}", __package__)
+from . import approval_tokens, password_pool
+from .auth import require_roles
+from .cfdi_queue import CFDI_RELAY, CfdiRelay
+from .email import EMAIL_OUTBOX_SENDER, OutboxSender
+from .quote_expiry import QUOTE_SWEEPER, QuoteExpirySweeper
 
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -47,13 +60,86 @@ logger = logging.getLogger(__name__)
 
 
 REQUEST_COUNTER = Counter("http_requests_total", "Total HTTP requests")
+register_pool_metrics()
+
+# Router modules, imported one by one so startup_profile can attribute cost
+ROUTER_MODULES = (
+    "auth",
+    "quotes",
+    "cfdi",
+    "billing",
+    "stock",
+    "invoice",
+    "customers",
+    "vehicles",
+    "quote_items",
+    "work_orders",
+    "attachments",
+    "license_state",
+    "exports",
+)
+# auth is already loaded above; its cost stays the one recorded there
+_routers = [startup_profile.timed_import(f".{name}", __package__) for name in ROUTER_MODULES]
+
+
+def _check_schema() -> None:
+    """Cheap startup guard: compare alembic_version with the migration heads."""
+    if DB_SCHEMA_CHECK == "off":
+        return
+    try:
+        current, heads = get_schema_revisions()
+    except Exception as exc:
+        if DB_SCHEMA_CHECK == "strict":
+            raise
+        logger.warning("schema check failed: %s", exc)
+        return
+    if current == heads:
+        return
+    msg = f"database schema at {sorted(current)}, expected {sorted(heads)}; run `python -m app.migrate`"
+    if DB_SCHEMA_CHECK == "strict":
+        raise RuntimeError(msg)
+    logger.warning(msg)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    _check_schema()
     if DATABASE_URL.startswith("sqlite"):
         Base.metadata.create_all(bind=engine)
+    if approval_tokens.APPROVAL_TOKEN_FILTER and approval_tokens.store() is None:
+        logger.info("approval token set disabled: REDIS_URL does not point at a reachable Redis")
+    elif approval_tokens.APPROVAL_TOKEN_FILTER:
+        try:
+            with SessionLocal() as db:
+                loaded = approval_tokens.rebuild(db)
+            logger.info("approval token set loaded with %s tokens", loaded)
+        except Exception as exc:
+            # Without the set every lookup simply falls back to the database
+            logger.warning("approval token set not loaded: %s", exc)
+    startup_profile.mark_ready()
+    profile = startup_profile.report()
+    logger.info("startup profile %s", json.dumps(profile))
+    if profile["over_budget"]:
+        logger.warning(
+            "startup took %.0f ms, over the %.0f ms budget", profile["ready_ms"], profile["budget_ms"]
+        )
+    sender = OutboxSender(SessionLocal) if EMAIL_OUTBOX_SENDER else None
+    if sender is not None:
+        sender.start()
+    relay = CfdiRelay(SessionLocal) if CFDI_RELAY else None
+    if relay is not None:
+        relay.start()
+    sweeper = QuoteExpirySweeper(SessionLocal) if QUOTE_SWEEPER else None
+    if sweeper is not None:
+        sweeper.start()
     yield
+    if sweeper is not None:
+        sweeper.stop()
+    if relay is not None:
+        relay.stop()
+    if sender is not None:
+        sender.stop()
+    password_pool.shutdown()
 
 
 app = FastAPI(title="Nexora Core API", version="0.1.1", lifespan=lifespan)
@@ -77,6 +163,21 @@ def license_status():
 async def _metrics_middleware(request: Request, call_next):
     response = await call_next(request)
     REQUEST_COUNTER.inc()
+    startup_profile.mark_first_request()
+    return response
+
+
+@app.middleware("http")
+async def _read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if DATABASE_READ_URL and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        key = await run_in_threadpool(writer_key, request)
+        if key:
+            try:
+                await run_in_threadpool(note_write, key)
+            except Exception as exc:
+                # The write succeeded; at worst the next read hits the replica
+                logger.warning("read-after-write marker not stored: %s", exc)
     return response
 
 
@@ -84,15 +185,10 @@ async def _metrics_middleware(request: Request, call_next):
 def metrics() -> Response:
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-app.include_router(auth_router.router)
-app.include_router(quotes_router.router)
-app.include_router(cfdi_router.router)
-app.include_router(billing_router.router)
-app.include_router(stock_router.router)
-app.include_router(invoice_router.router)
-app.include_router(customers_router.router)
-app.include_router(vehicles_router.router)
-app.include_router(quote_items_router.router)
-app.include_router(work_orders_router.router)
-app.include_router(attachments_router.router)
-app.include_router(license_state_router.router)
+
+@app.get("/startup-profile")
+def startup_profile_report(claims: dict = Depends(require_roles(["admin"]))):
+    return startup_profile.report()
+
+for module in _routers:
+    app.include_router(module.router)
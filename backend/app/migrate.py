@@ -0,0 +1,27 @@
+"""One-shot schema migration job.
+
+Run before starting the API workers (``python -m app.migrate`` inside the
+image, ``python -m backend.app.migrate`` from the repo root)::
+
+    python -m app.migrate           # alembic upgrade head
+    python -m app.migrate --check   # exit 1 if the schema is not at head
+"""
+import argparse
+import sys
+
+from .db import get_schema_revisions, run_migrations
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only report whether the schema is at head")
+    args = parser.parse_args(argv)
+    if not args.check:
+        run_migrations()
+    current, heads = get_schema_revisions(refresh=True)
+    print(f"schema current={sorted(current)} head={sorted(heads)}")
+    return 0 if current == heads else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
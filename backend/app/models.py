@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from sqlalchemy import (
     String,
+    Text,
     Float,
+    Date,
     DateTime,
     Table,
     Column,
@@ -9,10 +11,22 @@ from sqlalchemy import (
     Integer,
     Boolean,
     Index,
+    event,
+    text,
 )
 from .db import Base
 from uuid import uuid4
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+
+
+def normalize_email(email: str) -> str:
+    """Forma canónica de ``users.email``: las búsquedas comparan por igualdad y usan ``ix_users_email``."""
+    return email.strip().lower()
+
+
+# RFCs genéricos del SAT (público en general / extranjero): no identifican cliente
+GENERIC_RFCS = ("XAXX010101000", "XEXX010101000")
+CUSTOMER_RFC_KEYED = text("rfc NOT IN ('XAXX010101000', 'XEXX010101000')")
 
 
 user_roles = Table(
@@ -46,6 +60,10 @@ class UserORM(Base):
         "RoleORM", secondary=user_roles, back_populates="users"
     )
 
+    @validates("email")
+    def _normalize_email(self, key: str, value: str) -> str:
+        return normalize_email(value)
+
 
 class CustomerORM(Base):
     __tablename__ = "customers"
@@ -55,7 +73,16 @@ class CustomerORM(Base):
     rfc: Mapped[str] = mapped_column(String(64), nullable=False)
     email: Mapped[str | None] = mapped_column(String(255), nullable=True)
     phone: Mapped[str | None] = mapped_column(String(32), nullable=True)
-    __table_args__ = (Index("idx_customers_name", "name"),)
+    __table_args__ = (
+        Index("idx_customers_name", "name"),
+        Index(
+            "ux_customers_rfc",
+            "rfc",
+            unique=True,
+            sqlite_where=CUSTOMER_RFC_KEYED,
+            postgresql_where=CUSTOMER_RFC_KEYED,
+        ),
+    )
 
     vehicles: Mapped[list["VehicleORM"]] = relationship(
         "VehicleORM", back_populates="customer", cascade="all, delete-orphan"
@@ -92,6 +119,9 @@ class QuoteORM(Base):
         ForeignKey("customers.id", ondelete="SET NULL"), nullable=True, index=True
     )
     total: Mapped[float] = mapped_column(Float, nullable=False)
+    # Maintained from quote_items by quote_items.refresh_quote_totals; total = subtotal + tax_total
+    subtotal: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    tax_total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
     status: Mapped[str] = mapped_column(String(32), nullable=False, default="pending")
     token: Mapped[str] = mapped_column(String(64), nullable=False, default=lambda: uuid4().hex)
     created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc))
@@ -101,6 +131,10 @@ class QuoteORM(Base):
     __table_args__ = (
         Index("idx_quotes_customer", "customer_id"),
         Index("ux_quotes_approval_token", "token", unique=True),
+        Index("idx_quotes_status", "status", "id"),
+        Index("idx_quotes_created_at", "created_at"),
+        # Expiry sweeper: pending quotes ordered by token expiry
+        Index("idx_quotes_token_expiry", "status", "token_expires_at"),
     )
 
     customer_obj: Mapped[CustomerORM | None] = relationship(
@@ -121,7 +155,7 @@ class StockORM(Base):
     item: Mapped[str] = mapped_column(String(255), nullable=False)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     unit_price: Mapped[float] = mapped_column(Float, nullable=False)
-    __table_args__ = (Index("idx_stock_item", "item"),)
+    __table_args__ = (Index("ux_stock_item", "item", unique=True),)
 
 
 class QuoteItemORM(Base):
@@ -136,12 +170,25 @@ class QuoteItemORM(Base):
     unit_price: Mapped[float] = mapped_column(Float, nullable=False)
     tax_rate: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     is_approved: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    __table_args__ = (Index("idx_quote_items_quote", "quote_id", "id"),)
 
     quote: Mapped[QuoteORM] = relationship(
         "QuoteORM", back_populates="items"
     )
 
 
+class QuoteRollupORM(Base):
+    """Quotes per creation day, customer and status; maintained by ``quote_rollup``."""
+
+    __tablename__ = "quote_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    customer: Mapped[str] = mapped_column(String(255), primary_key=True)
+    status: Mapped[str] = mapped_column(String(32), primary_key=True)
+    quote_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+
 class WorkOrderORM(Base):
     __tablename__ = "work_orders"
 
@@ -153,6 +200,10 @@ class WorkOrderORM(Base):
     created_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
     )
+    __table_args__ = (
+        Index("idx_work_orders_status", "status", "id"),
+        Index("idx_work_orders_created_at", "created_at"),
+    )
 
     quote: Mapped[QuoteORM | None] = relationship(
         "QuoteORM", back_populates="work_order"
@@ -195,7 +246,10 @@ class InvoiceORM(Base):
     created_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
     )
-    __table_args__ = (Index("idx_invoices_customer", "customer"),)
+    __table_args__ = (
+        Index("idx_invoices_customer", "customer"),
+        Index("idx_invoices_created_at", "created_at"),
+    )
 
 
 class CfdiDocumentORM(Base):
@@ -227,6 +281,9 @@ class CfdiPendingORM(Base):
     updated_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
     )
+    # Outbox: set by the relay when the job was last pushed to the queue
+    published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (Index("idx_cfdi_pending_relay", "status", "published_at"),)
 
 
 class TaxConfigORM(Base):
@@ -240,6 +297,28 @@ class TaxConfigORM(Base):
     )
 
 
+class EmailOutboxORM(Base):
+    __tablename__ = "email_outbox"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=lambda: uuid4().hex)
+    recipient: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    locked_by: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
+    )
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (Index("idx_email_outbox_due", "status", "next_attempt_at"),)
+
+
 class SubscriptionORM(Base):
     __tablename__ = "subscriptions"
 
@@ -252,3 +331,19 @@ class SubscriptionORM(Base):
     created_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
     )
+
+
+# Tablas con ETag en sus listados; el contador se incrementa en cada escritura
+VERSIONED_TABLES = ("quotes", "work_orders", "stock")
+
+
+class TableVersionORM(Base):
+    __tablename__ = "table_versions"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+@event.listens_for(TableVersionORM.__table__, "after_create")
+def _seed_table_versions(target, connection, **kw) -> None:
+    connection.execute(target.insert(), [{"table_name": t, "version": 0} for t in VERSIONED_TABLES])
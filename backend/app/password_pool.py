@@ -0,0 +1,111 @@
+"""Dedicated process pool for bcrypt.
+
+bcrypt is deliberately slow CPU work; run inline it ties up anyio's shared
+threadpool (and the GIL) during a login burst and stalls unrelated requests.
+Hashing runs in a small process pool instead. When more than
+``PASSWORD_POOL_MAX_PENDING`` calls are queued or running, new ones are
+rejected at once with 503 so clients back off instead of piling up.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter, Gauge, Histogram
+
+# 0 runs bcrypt in the shared threadpool as before
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "32"))
+
+HASH_SECONDS = Histogram("password_hash_seconds", "bcrypt time inside a pool worker", ["op"])
+QUEUE_WAIT_SECONDS = Histogram(
+    "password_pool_wait_seconds", "Time a bcrypt call waited for a free pool worker"
+)
+REJECTED = Counter("password_pool_rejected_total", "bcrypt calls rejected because the pool was full")
+
+_lock = threading.Lock()
+_pending = 0
+_executor: ProcessPoolExecutor | None = None
+
+Gauge("password_pool_pending", "bcrypt calls queued or running").set_function(lambda: _pending)
+
+
+def hash_password(password: str) -> str:
+    import bcrypt
+
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    import bcrypt
+
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+def _timed(fn, *args):
+    # Runs in the worker; wall clock so the parent can compute the queue wait
+    started = time.time()
+    t0 = time.perf_counter()
+    return fn(*args), started, time.perf_counter() - t0
+
+
+def _done(future: Future, op: str, submitted: float) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+    if future.cancelled() or future.exception() is not None:
+        return
+    _, started, elapsed = future.result()
+    QUEUE_WAIT_SECONDS.observe(max(0.0, started - submitted))
+    HASH_SECONDS.labels(op=op).observe(elapsed)
+
+
+def _submit(fn, *args) -> Future:
+    global _pending, _executor
+    with _lock:
+        if _pending >= PASSWORD_POOL_MAX_PENDING:
+            REJECTED.inc()
+            raise HTTPException(status_code=503, detail="auth_busy", headers={"Retry-After": "1"})
+        _pending += 1
+        if _executor is None:
+            # spawn: forking a process that holds DB connections and threads is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    submitted = time.time()
+    try:
+        future = _executor.submit(_timed, fn, *args)
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+    future.add_done_callback(lambda f: _done(f, fn.__name__.split("_")[0], submitted))
+    return future
+
+
+async def run(fn, *args):
+    """Await ``fn(*args)`` (``hash_password``/``verify_password``) on the pool."""
+    if not PASSWORD_POOL_WORKERS:
+        return await run_in_threadpool(fn, *args)
+    result, _, _ = await asyncio.wrap_future(_submit(fn, *args))
+    return result
+
+
+def run_sync(fn, *args):
+    """Same as ``run`` for sync endpoints: the worker thread only waits, bcrypt runs elsewhere."""
+    if not PASSWORD_POOL_WORKERS:
+        return fn(*args)
+    result, _, _ = _submit(fn, *args).result()
+    return result
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
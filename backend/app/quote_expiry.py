@@ -0,0 +1,92 @@
+"""Background sweeper that moves pending quotes with an expired token to ``expired``.
+
+Tokens are otherwise only checked when presented, so abandoned quotes would stay
+``pending`` forever. Each pass updates at most ``QUOTE_SWEEP_BATCH_SIZE`` rows
+per transaction (picked through ``idx_quotes_token_expiry``), keeping locks and
+transactions short; it loops while full batches come back.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from prometheus_client import Counter
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .models import QuoteORM
+from .quote_rollup import Changes
+
+logger = logging.getLogger(__name__)
+
+QUOTE_SWEEPER = os.getenv("QUOTE_SWEEPER", "1").lower() in ("1", "true", "yes")
+QUOTE_SWEEP_SECONDS = float(os.getenv("QUOTE_SWEEP_SECONDS", "60"))
+QUOTE_SWEEP_BATCH_SIZE = int(os.getenv("QUOTE_SWEEP_BATCH_SIZE", "500"))
+
+QUOTES_EXPIRED = Counter("quotes_expired_total", "Pending quotes moved to expired by the sweeper")
+
+
+def _expired(now: datetime):
+    return (QuoteORM.status == "pending") & (QuoteORM.token_expires_at < now)
+
+
+def sweep_batch(db: Session, batch_size: int = QUOTE_SWEEP_BATCH_SIZE) -> int:
+    """Expire one batch and commit it; returns how many quotes were expired."""
+    now = datetime.now(timezone.utc)
+    batch = select(QuoteORM.id).where(_expired(now)).order_by(QuoteORM.token_expires_at).limit(batch_size)
+    rows = db.execute(
+        update(QuoteORM)
+        # Condition repeated so a quote approved meanwhile is left alone
+        .where(QuoteORM.id.in_(batch.scalar_subquery()), _expired(now))
+        .values(status="expired")
+        .returning(QuoteORM.created_at, QuoteORM.customer, QuoteORM.total)
+        .execution_options(synchronize_session=False)
+    ).all()
+    changes = Changes()
+    for created_at, customer, total in rows:
+        changes.moved(created_at, customer, total, "pending", "expired")
+    changes.apply(db)
+    db.commit()
+    swept = len(rows)
+    if swept:
+        QUOTES_EXPIRED.inc(swept)
+    return swept
+
+
+def sweep(db: Session, batch_size: int = QUOTE_SWEEP_BATCH_SIZE) -> int:
+    total = 0
+    while True:
+        swept = sweep_batch(db, batch_size)
+        total += swept
+        if swept < batch_size:
+            return total
+
+
+class QuoteExpirySweeper:
+    """Background thread running ``sweep`` every ``QUOTE_SWEEP_SECONDS``."""
+
+    def __init__(self, session_factory, batch_size: int = QUOTE_SWEEP_BATCH_SIZE) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    swept = sweep(db, self.batch_size)
+                if swept:
+                    logger.info("expired %s pending quotes", swept)
+            except Exception:  # pragma: no cover
+                logger.exception("quote expiry sweep failed")
+            self._stop.wait(QUOTE_SWEEP_SECONDS)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="quote-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
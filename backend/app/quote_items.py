@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
-from .models import QuoteItemORM
+from .db import get_async_read_db, get_db
+from .models import QuoteItemORM, QuoteORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
+from .quote_rollup import Changes
 
 
 router = APIRouter(prefix="/quote-items", tags=["quote_items"])
@@ -36,24 +40,49 @@ class QuoteItem(BaseModel):
     is_approved: bool
 
 
+def refresh_quote_totals(db: Session, quote_id: str) -> None:
+    """Recompute the quote's subtotal/tax_total/total from its items in one UPDATE.
+
+    ``tax_rate`` is a percentage (16.0 = 16 %). The quote row is locked and its
+    previous total read first: concurrent item writes to the same quote then
+    recompute one after the other, and the summary rollup gets the difference.
+    """
+    amount = QuoteItemORM.qty * QuoteItemORM.unit_price
+
+    def _sum(expr):
+        return (
+            select(func.coalesce(func.sum(expr), 0.0))
+            .where(QuoteItemORM.quote_id == QuoteORM.id)
+            .scalar_subquery()
+        )
+
+    old = db.execute(
+        select(QuoteORM.total).where(QuoteORM.id == quote_id).with_for_update()
+    ).scalar_one_or_none()
+    subtotal, tax_total = _sum(amount), _sum(amount * QuoteItemORM.tax_rate / 100.0)
+    updated = db.execute(
+        update(QuoteORM)
+        .where(QuoteORM.id == quote_id)
+        .values(subtotal=subtotal, tax_total=tax_total, total=subtotal + tax_total)
+        .returning(QuoteORM.created_at, QuoteORM.customer, QuoteORM.status, QuoteORM.total)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if updated is not None and old is not None and updated.total != old:
+        changes = Changes().retotaled(updated.created_at, updated.customer, updated.status, updated.total - old)
+        changes.apply(db)
+
+
 @router.get("/", response_model=list[QuoteItem])
-def list_items(
-    db: Session = Depends(get_db),
+async def list_items(
+    quote_id: str | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    rows = db.query(QuoteItemORM).all()
-    return [
-        QuoteItem(
-            id=r.id,
-            quote_id=r.quote_id,
-            description=r.description,
-            qty=r.qty,
-            unit_price=r.unit_price,
-            tax_rate=r.tax_rate,
-            is_approved=r.is_approved,
-        )
-        for r in rows
-    ]
+    stmt = project(QuoteItem, QuoteItemORM)
+    if quote_id is not None:
+        stmt = stmt.where(QuoteItemORM.quote_id == quote_id)
+    return await paginate_json(db, QuoteItem, stmt, QuoteItemORM.id, page)
 
 
 @router.post("/", response_model=QuoteItem)
@@ -70,6 +99,8 @@ def create_item(
         tax_rate=payload.tax_rate,
     )
     db.add(row)
+    db.flush()
+    refresh_quote_totals(db, row.quote_id)
     db.commit()
     db.refresh(row)
     return QuoteItem(
@@ -104,6 +135,9 @@ def update_item(
     if payload.is_approved is not None:
         row.is_approved = payload.is_approved
     db.add(row)
+    if payload.qty is not None or payload.unit_price is not None or payload.tax_rate is not None:
+        db.flush()
+        refresh_quote_totals(db, row.quote_id)
     db.commit()
     db.refresh(row)
     return QuoteItem(
@@ -127,6 +161,8 @@ def delete_item(
     if not row:
         raise HTTPException(status_code=404, detail="quote_item_not_found")
     db.delete(row)
+    db.flush()
+    refresh_quote_totals(db, row.quote_id)
     db.commit()
     return {"deleted": True}
 
@@ -0,0 +1,105 @@
+"""Incremental rollup of quotes behind ``GET /quotes/summary``.
+
+``quote_rollups`` holds one row per (creation day, customer, status) with the
+number of quotes and the sum of their totals. Every write path that creates
+a quote, changes its status or its total records the change in a ``Changes``
+and applies it in the same transaction, as one upsert that adds the deltas
+(``quote_count = quote_count + excluded.quote_count``). The summary therefore
+reads a few hundred rollup rows no matter how many quotes exist.
+
+Writes that bypass these paths (raw SQL, manual fixes) are repaired with
+``rebuild``.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import QuoteORM, QuoteRollupORM
+
+# Rows per upsert statement (SQLite caps bound parameters per statement)
+_CHUNK = 1000
+
+
+def day_of(created_at: datetime | None) -> date:
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    # Naive values come from SQLite, which stores UTC without tzinfo
+    return created_at.date()
+
+
+def _insert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+class Changes:
+    """Deltas to ``quote_rollups`` accumulated during one transaction."""
+
+    def __init__(self) -> None:
+        self._deltas: dict[tuple[date, str, str], list] = defaultdict(lambda: [0, 0.0])
+
+    def add(self, created_at, customer: str, status: str, count: int, total: float) -> "Changes":
+        delta = self._deltas[(day_of(created_at), customer, status)]
+        delta[0] += count
+        delta[1] += total
+        return self
+
+    def created(self, created_at, customer: str, total: float, status: str = "pending") -> "Changes":
+        return self.add(created_at, customer, status, 1, total)
+
+    def moved(self, created_at, customer: str, total: float, old: str, new: str) -> "Changes":
+        self.add(created_at, customer, old, -1, -total)
+        return self.add(created_at, customer, new, 1, total)
+
+    def retotaled(self, created_at, customer: str, status: str, delta: float) -> "Changes":
+        return self.add(created_at, customer, status, 0, delta)
+
+    def statements(self, dialect: str) -> list:
+        rows = [
+            {"day": day, "customer": customer, "status": status, "quote_count": count, "total": total}
+            for (day, customer, status), (count, total) in sorted(self._deltas.items())
+            if count or total
+        ]
+        stmts = []
+        for i in range(0, len(rows), _CHUNK):
+            stmt = _insert(dialect)(QuoteRollupORM).values(rows[i : i + _CHUNK])
+            stmts.append(
+                stmt.on_conflict_do_update(
+                    index_elements=["day", "customer", "status"],
+                    set_={
+                        "quote_count": QuoteRollupORM.quote_count + stmt.excluded.quote_count,
+                        "total": QuoteRollupORM.total + stmt.excluded.total,
+                    },
+                )
+            )
+        return stmts
+
+    def apply(self, db: Session) -> None:
+        for stmt in self.statements(db.get_bind().dialect.name):
+            db.execute(stmt)
+
+    async def apply_async(self, db: AsyncSession) -> None:
+        for stmt in self.statements(db.get_bind().dialect.name):
+            await db.execute(stmt)
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every rollup row from ``quotes``; returns how many quotes were read."""
+    changes = Changes()
+    read = 0
+    stmt = select(QuoteORM.created_at, QuoteORM.customer, QuoteORM.status, QuoteORM.total)
+    for created_at, customer, status, total in db.execute(stmt.execution_options(yield_per=1000)):
+        changes.created(created_at, customer, total, status)
+        read += 1
+    db.execute(delete(QuoteRollupORM))
+    changes.apply(db)
+    db.commit()
+    return read
@@ -1,28 +1,25 @@
 import logging
-import time
-from collections import deque
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
 
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from .db import get_db
-from .models import QuoteORM
+from pydantic import BaseModel, Field
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from .db import get_async_db, get_async_read_db, get_db
+from .models import QuoteORM, QuoteRollupORM
 from .auth import require_roles
-from .cfdi_queue import enqueue_cfdi_draft
-
-# Rate limiter simple en memoria (clave -> deque de timestamps)
-_RATE_BUCKETS: dict[str, deque[float]] = {}
-
-def _rate_allow(key: str, limit: int, window_seconds: int) -> bool:
-    now = time.time()
-    q = _RATE_BUCKETS.setdefault(key, deque())
-    while q and now - q[0] > window_seconds:
-        q.popleft()
-    if len(q) >= limit:
-        return False
-    q.append(now)
-    return True
+from .pagination import PageParams, paginate_json, project
+from .etag import conditional
+from .ratelimit import rate_limit
+from . import approval_tokens
+from .quote_rollup import Changes
+from .cfdi_queue import add_cfdi_draft, add_cfdi_drafts
+from .customers import Customer
+from .quote_items import QuoteItem
+from .work_orders import WorkOrder
 
 router = APIRouter(prefix="/quotes", tags=["quotes"])
 
@@ -38,6 +35,27 @@ def _as_aware_utc(dt: datetime | None) -> datetime | None:
         return dt.replace(tzinfo=timezone.utc)
     return dt
 
+def _set_pending_to(quote_id: str, status: str):
+    """Conditional ``pending`` -> ``status`` UPDATE; returns no row if another request moved the quote first."""
+    return (
+        update(QuoteORM)
+        .where(QuoteORM.id == quote_id, QuoteORM.status == "pending")
+        .values(status=status)
+        .returning(QuoteORM.customer, QuoteORM.total, QuoteORM.created_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def _to_quote(row: QuoteORM) -> "Quote":
+    return Quote(
+        id=row.id,
+        customer=row.customer,
+        total=row.total,
+        subtotal=row.subtotal,
+        tax_total=row.tax_total,
+        status=row.status,
+        token=row.token,
+    )
+
 class QuoteCreate(BaseModel):
     customer: str
     total: float
@@ -46,9 +64,19 @@ class Quote(BaseModel):
     id: str
     customer: str
     total: float
+    subtotal: float = 0.0
+    tax_total: float = 0.0
     status: str = "pending"
     token: str
 
+class QuoteDetail(Quote):
+    customer_id: int | None = None
+    created_at: datetime | None = None
+    token_expires_at: datetime | None = None
+    items: list[QuoteItem] = []
+    customer_obj: Customer | None = None
+    work_order: WorkOrder | None = None
+
 class ApproveCheckRequest(BaseModel):
     token: str
 
@@ -56,14 +84,130 @@ class ApproveCheckResponse(BaseModel):
     ok: bool
     quote_id: str | None = None
 
+class QuoteBatchRequest(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=500)
+    action: Literal["approve", "reject"]
+
+class QuoteBatchResult(BaseModel):
+    id: str
+    ok: bool
+    status: str | None = None
+    detail: str | None = None
+
+class QuoteBatchResponse(BaseModel):
+    updated: int
+    results: list[QuoteBatchResult]
+
+class SummaryCell(BaseModel):
+    count: int = 0
+    total: float = 0.0
+
+class SummaryBucket(BaseModel):
+    period: date
+    customer: str | None = None
+    status: str
+    count: int
+    total: float
+
+class QuoteSummary(BaseModel):
+    funnel: dict[str, SummaryCell]
+    series: list[SummaryBucket]
+
+
+def _bucket_order(item: tuple) -> tuple:
+    (day, name, status), _ = item
+    return day, name or "", status
+
+
+def _approval_token(payload: ApproveCheckRequest) -> str:
+    return payload.token.strip()
+
 @router.get("/", response_model=list[Quote])
-def list_quotes(
-    db: Session = Depends(get_db),
+async def list_quotes(
+    status: str | None = None,
+    customer_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin", "user"])),
+    etag: str | None = Depends(conditional("quotes")),
 ):
     logger.info("list quotes")
-    rows = db.query(QuoteORM).all()
-    return [Quote(id=r.id, customer=r.customer, total=r.total, status=r.status, token=r.token) for r in rows]
+    stmt = project(Quote, QuoteORM)
+    if status is not None:
+        stmt = stmt.where(QuoteORM.status == status)
+    if customer_id is not None:
+        stmt = stmt.where(QuoteORM.customer_id == customer_id)
+    if created_from is not None:
+        stmt = stmt.where(QuoteORM.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(QuoteORM.created_at < created_to)
+    return await paginate_json(db, Quote, stmt, QuoteORM.id, page, etag=etag)
+
+@router.get("/summary", response_model=QuoteSummary)
+async def quotes_summary(
+    period: Literal["day", "week"] = "day",
+    date_from: date | None = None,
+    date_to: date | None = None,
+    customer: str | None = None,
+    by_customer: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+    claims: dict = Depends(require_roles(["admin", "user"])),
+):
+    """Funnel and series by creation day/week, read from ``quote_rollups`` only."""
+    stmt = select(
+        QuoteRollupORM.day, QuoteRollupORM.customer, QuoteRollupORM.status,
+        QuoteRollupORM.quote_count, QuoteRollupORM.total,
+    )
+    if date_from is not None:
+        stmt = stmt.where(QuoteRollupORM.day >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(QuoteRollupORM.day <= date_to)
+    if customer is not None:
+        stmt = stmt.where(QuoteRollupORM.customer == customer)
+    funnel: dict[str, SummaryCell] = {}
+    buckets: dict[tuple, SummaryCell] = {}
+    for day, name, status, count, total in (await db.execute(stmt)).all():
+        if period == "week":
+            day = day - timedelta(days=day.weekday())
+        for cell in (
+            funnel.setdefault(status, SummaryCell()),
+            buckets.setdefault((day, name if by_customer else None, status), SummaryCell()),
+        ):
+            cell.count += count
+            cell.total += total
+    series = [
+        SummaryBucket(period=day, customer=name, status=status, count=cell.count, total=round(cell.total, 2))
+        for (day, name, status), cell in sorted(buckets.items(), key=_bucket_order)
+        if cell.count
+    ]
+    for cell in funnel.values():
+        cell.total = round(cell.total, 2)
+    return QuoteSummary(funnel=funnel, series=series)
+
+@router.get("/{quote_id}", response_model=QuoteDetail)
+async def get_quote(
+    quote_id: str,
+    db: AsyncSession = Depends(get_async_read_db),
+    claims: dict = Depends(require_roles(["admin", "user"])),
+):
+    """Quote with items, customer and work order in two SQL statements."""
+    stmt = (
+        select(QuoteORM)
+        .where(QuoteORM.id == quote_id)
+        .options(
+            joinedload(QuoteORM.customer_obj),
+            joinedload(QuoteORM.work_order),
+            selectinload(QuoteORM.items),
+        )
+    )
+    row = (await db.execute(stmt)).unique().scalar_one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="quote_not_found")
+    detail = QuoteDetail.model_validate(row, from_attributes=True)
+    detail.items.sort(key=lambda item: item.id)
+    return detail
 
 @router.post("/", response_model=Quote)
 def create_quote(
@@ -72,21 +216,32 @@ def create_quote(
     claims: dict = Depends(require_roles(["admin", "user"])),
 ):
     logger.info("create quote for %s", payload.customer)
-    row = QuoteORM(customer=payload.customer, total=payload.total)
+    row = QuoteORM(
+        customer=payload.customer,
+        total=payload.total,
+        subtotal=payload.total,
+        created_at=datetime.now(timezone.utc),
+    )
     db.add(row)
+    Changes().created(row.created_at, row.customer, row.total).apply(db)
     db.commit()
     db.refresh(row)
-    return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
+    approval_tokens.remember(row.token, row.token_expires_at)
+    return _to_quote(row)
 
 @router.post("/approve-check", response_model=ApproveCheckResponse)
-def approve_check(payload: ApproveCheckRequest, db: Session = Depends(get_db)):
+async def approve_check(
+    payload: ApproveCheckRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _limit: None = Depends(rate_limit("check", limit=10, period=60, key=_approval_token)),
+):
     token = payload.token.strip()
     logger.info("approve check %s", token)
     if not token:
         raise HTTPException(status_code=400, detail="token_required")
-    if not _rate_allow(f"check:{token}", limit=10, window_seconds=60):
-        raise HTTPException(status_code=429, detail="rate_limited")
-    row = db.query(QuoteORM).filter(QuoteORM.token == token).first()
+    if await approval_tokens.known(token) is False:
+        return ApproveCheckResponse(ok=False, quote_id=None)
+    row = (await db.execute(select(QuoteORM).where(QuoteORM.token == token))).scalars().first()
     if not row:
         return ApproveCheckResponse(ok=False, quote_id=None)
     # Expirado: tratar como inválido en el check
@@ -97,14 +252,18 @@ def approve_check(payload: ApproveCheckRequest, db: Session = Depends(get_db)):
     return ApproveCheckResponse(ok=True, quote_id=row.id)
 
 @router.post("/approve-confirm", response_model=Quote)
-def approve_confirm(payload: ApproveCheckRequest, db: Session = Depends(get_db)):
+async def approve_confirm(
+    payload: ApproveCheckRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _limit: None = Depends(rate_limit("confirm", limit=5, period=60, key=_approval_token)),
+):
     token = payload.token.strip()
     logger.info("approve confirm %s", token)
     if not token:
         raise HTTPException(status_code=400, detail="token_required")
-    if not _rate_allow(f"confirm:{token}", limit=5, window_seconds=60):
-        raise HTTPException(status_code=429, detail="rate_limited")
-    row = db.query(QuoteORM).filter(QuoteORM.token == token).first()
+    if await approval_tokens.known(token) is False:
+        raise HTTPException(status_code=404, detail="quote_not_found")
+    row = (await db.execute(select(QuoteORM).where(QuoteORM.token == token))).scalars().first()
     if not row:
         raise HTTPException(status_code=404, detail="quote_not_found")
     now = datetime.now(timezone.utc)
@@ -112,15 +271,23 @@ def approve_confirm(payload: ApproveCheckRequest, db: Session = Depends(get_db))
     if expires_at is not None and expires_at < now:
         raise HTTPException(status_code=410, detail="token_expired")
     if row.status == "approved":
-        return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
-    if row.status == "rejected":
+        return _to_quote(row)
+    if row.status != "pending":
         raise HTTPException(status_code=409, detail="invalid_transition")
-    row.status = "approved"
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-    enqueue_cfdi_draft(db, row.id, row.customer, row.total)
-    return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
+    # Only the request whose UPDATE wins the pending -> approved race stages the CFDI
+    updated = (await db.execute(_set_pending_to(row.id, "approved"))).one_or_none()
+    if updated is None:
+        await db.refresh(row)
+        if row.status == "approved":
+            return _to_quote(row)
+        raise HTTPException(status_code=409, detail="invalid_transition")
+    set_committed_value(row, "status", "approved")
+    # Status change, CFDI outbox row and rollup in one commit; the relay publishes the job
+    add_cfdi_draft(db, row.id, updated.customer, updated.total)
+    # Rollup delta from the row the UPDATE actually moved
+    await Changes().moved(updated.created_at, updated.customer, updated.total, "pending", "approved").apply_async(db)
+    await db.commit()
+    return _to_quote(row)
 
 @router.post("/{quote_id}/approve", response_model=Quote)
 def approve_quote(
@@ -133,15 +300,21 @@ def approve_quote(
     if not row:
         raise HTTPException(status_code=404, detail="quote_not_found")
     if row.status == "approved":
-        return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
-    if row.status == "rejected":
+        return _to_quote(row)
+    if row.status != "pending":
         raise HTTPException(status_code=409, detail="invalid_transition")
-    row.status = "approved"
-    db.add(row)
+    updated = db.execute(_set_pending_to(row.id, "approved")).one_or_none()
+    if updated is None:
+        db.refresh(row)
+        if row.status == "approved":
+            return _to_quote(row)
+        raise HTTPException(status_code=409, detail="invalid_transition")
+    set_committed_value(row, "status", "approved")
+    add_cfdi_draft(db, row.id, updated.customer, updated.total)
+    Changes().moved(updated.created_at, updated.customer, updated.total, "pending", "approved").apply(db)
+    quote = _to_quote(row)
     db.commit()
-    db.refresh(row)
-    enqueue_cfdi_draft(db, row.id, row.customer, row.total)
-    return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
+    return quote
 
 @router.post("/{quote_id}/reject", response_model=Quote)
 def reject_quote(
@@ -154,11 +327,59 @@ def reject_quote(
     if not row:
         raise HTTPException(status_code=404, detail="quote_not_found")
     if row.status == "rejected":
-        return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
-    if row.status == "approved":
+        return _to_quote(row)
+    if row.status != "pending":
         raise HTTPException(status_code=409, detail="invalid_transition")
-    row.status = "rejected"
-    db.add(row)
+    updated = db.execute(_set_pending_to(row.id, "rejected")).one_or_none()
+    if updated is None:
+        db.refresh(row)
+        if row.status == "rejected":
+            return _to_quote(row)
+        raise HTTPException(status_code=409, detail="invalid_transition")
+    set_committed_value(row, "status", "rejected")
+    Changes().moved(updated.created_at, updated.customer, updated.total, "pending", "rejected").apply(db)
+    quote = _to_quote(row)
     db.commit()
-    db.refresh(row)
-    return Quote(id=row.id, customer=row.customer, total=row.total, status=row.status, token=row.token)
+    return quote
+
+@router.post("/batch", response_model=QuoteBatchResponse)
+def batch_transition(
+    payload: QuoteBatchRequest,
+    db: Session = Depends(get_db),
+    claims: dict = Depends(require_roles(["admin"])),
+):
+    """Approve or reject many quotes with one UPDATE, one outbox INSERT and one commit."""
+    ids = list(dict.fromkeys(payload.ids))
+    target = "approved" if payload.action == "approve" else "rejected"
+    logger.info("batch %s of %s quotes", payload.action, len(ids))
+    changed = db.execute(
+        update(QuoteORM)
+        .where(QuoteORM.id.in_(ids), QuoteORM.status == "pending")
+        .values(status=target)
+        .returning(QuoteORM.id, QuoteORM.customer, QuoteORM.total, QuoteORM.created_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    done = {row.id for row in changed}
+    rest = [i for i in ids if i not in done]
+    current: dict[str, str] = {}
+    if rest:
+        current = dict(db.execute(select(QuoteORM.id, QuoteORM.status).where(QuoteORM.id.in_(rest))).all())
+    if target == "approved":
+        add_cfdi_drafts(db, [(row.id, row.customer, row.total) for row in changed])
+    changes = Changes()
+    for row in changed:
+        changes.moved(row.created_at, row.customer, row.total, "pending", target)
+    changes.apply(db)
+    db.commit()
+
+    results = []
+    for quote_id in ids:
+        if quote_id in done or current.get(quote_id) == target:
+            results.append(QuoteBatchResult(id=quote_id, ok=True, status=target))
+        elif quote_id not in current:
+            results.append(QuoteBatchResult(id=quote_id, ok=False, detail="quote_not_found"))
+        else:
+            results.append(
+                QuoteBatchResult(id=quote_id, ok=False, status=current[quote_id], detail="invalid_transition")
+            )
+    return QuoteBatchResponse(updated=len(done), results=results)
@@ -0,0 +1,158 @@
+"""Rate limiting with GCRA (generic cell rate algorithm).
+
+Each key stores a single timestamp, its theoretical arrival time (TAT).
+A limit of ``limit`` requests per ``period`` seconds allows a burst of
+``limit`` and then one request every ``period / limit`` seconds. State lives
+in one of two backends:
+
+- ``MemoryBackend`` is per process. It is bounded to ``RATE_LIMIT_MAX_KEYS``
+  entries with LRU eviction, and an entry is dead once its TAT has passed.
+- ``RedisBackend`` is shared by every worker. Keys expire on their own.
+
+``RATE_LIMIT_BACKEND`` chooses between them: ``memory``, ``redis``, or
+``auto`` (the default), which uses Redis when ``REDIS_URL`` is set.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+from .redis_conn import get_redis
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "auto").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+def _gcra(tat: float | None, now: float, limit: int, period: float) -> tuple[bool, float, float]:
+    """Return ``(allowed, new_tat, retry_after)``."""
+    interval = period / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return False, tat, allow_at - now
+    return True, new_tat, 0.0
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._tats: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, period: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            allowed, tat, retry_after = _gcra(self._tats.get(key), now, limit, period)
+            if allowed:
+                self._tats[key] = tat
+            if key in self._tats:
+                # Denied hits count as activity too, or a key being hammered
+                # would be evicted and start over with a full burst
+                self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                # Oldest first: least recently hit, usually already idle
+                self._tats.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tats.clear()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class RedisBackend:
+    blocking = True
+
+    def __init__(self, client, prefix: str = "ratelimit:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key: str, limit: int, period: float) -> tuple[bool, float]:
+        name = self.prefix + key
+        outcome: tuple[bool, float] = (True, 0.0)
+
+        # WATCH/MULTI instead of a Lua script so it also runs on fakeredis
+        def _txn(pipe) -> None:
+            nonlocal outcome
+            stored = pipe.get(name)
+            now = time.time()
+            allowed, tat, retry_after = _gcra(float(stored) if stored else None, now, limit, period)
+            pipe.multi()
+            if allowed:
+                pipe.set(name, repr(tat), px=max(1, int((tat - now) * 1000)))
+            outcome = (allowed, retry_after)
+
+        self.client.transaction(_txn, name)
+        return outcome
+
+    def reset(self) -> None:
+        for name in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(name)
+
+
+def _make_backend():
+    use_redis = RATE_LIMIT_BACKEND == "redis" or (RATE_LIMIT_BACKEND == "auto" and os.getenv("REDIS_URL"))
+    if use_redis:
+        client = get_redis()
+        if client is not None:
+            return RedisBackend(client)
+    return MemoryBackend()
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = _make_backend()
+    return _backend
+
+
+def reset() -> None:
+    backend().reset()
+
+
+async def check(scope: str, key: str, limit: int, period: float) -> None:
+    """Count one hit for ``scope:key`` and raise 429 once over the limit."""
+    store = backend()
+    try:
+        if store.blocking:
+            allowed, retry_after = await run_in_threadpool(store.hit, f"{scope}:{key}", limit, period)
+        else:
+            allowed, retry_after = store.hit(f"{scope}:{key}", limit, period)
+    except Exception as exc:
+        # Fail open: an unreachable Redis must not take the login down with it
+        logger.warning("rate limiter unavailable: %s", exc)
+        return
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="rate_limited",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(scope: str, limit: int, period: float, key: Callable[..., str] = client_ip):
+    """Dependency factory; ``key`` is itself a dependency returning the bucket key."""
+
+    async def dependency(value: str = Depends(key)) -> None:
+        await check(scope, value, limit, period)
+
+    return dependency
@@ -0,0 +1,34 @@
+"""Shared Redis connection helper (falls back to fakeredis when unreachable)."""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis():
+    # Imported here so the API boots without paying for redis/fakeredis
+    try:
+        import redis
+    except Exception:  # pragma: no cover
+        redis = None
+    try:
+        import fakeredis
+    except Exception:  # pragma: no cover
+        fakeredis = None
+
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    if redis is not None:
+        try:
+            client = redis.from_url(url)
+            client.ping()
+            return client
+        except Exception as exc:  # pragma: no cover
+            logger.warning("redis unavailable: %s", exc)
+    if fakeredis is not None:
+        return fakeredis.FakeStrictRedis()
+    return None
+
+
+def is_shared(client) -> bool:
+    """True for a real Redis server, False for ``None`` or the fakeredis fallback."""
+    return client is not None and not type(client).__module__.startswith("fakeredis")
@@ -0,0 +1,210 @@
+"""Access-token revocation by per-user token generation.
+
+Every token carries ``gen``, the user's revocation generation when it was
+issued. ``revoke_user`` bumps the generation in Redis, which invalidates
+every earlier token of that user (password reset, role removal).
+
+Almost no user is ever revoked, so checks go through an in-process bloom
+filter of revoked subjects first. A negative answer, the common case, needs
+no I/O. Only possible hits ask Redis for the current generation. The filter
+is rebuilt from Redis every ``REVOCATION_SYNC_SECONDS``, which bounds how
+long another process can take to see a revocation. Filter entries expire
+once every token they could invalidate has expired; the generation counter
+itself is kept forever, so a later revocation always moves it forward and
+tokens stamped with an old generation never become valid again.
+
+Generations must outlive processes and be seen by every worker, so with
+``REDIS_URL`` set a real, reachable Redis is required: ``get_redis``'s
+in-process fakeredis fallback is refused and the call fails instead of
+silently forgetting revocations. Only without ``REDIS_URL`` (single-process
+development installs) are they kept in this process, and lost on restart.
+"""
+import logging
+import os
+import threading
+import time
+
+from .redis_conn import get_redis, is_shared
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# Must cover the longest access token lifetime (create_access_token: 8 h)
+REVOCATION_TTL_SECONDS = int(os.getenv("REVOCATION_TTL_SECONDS", str(8 * 3600)))
+
+_GEN_KEY = "auth:revoked:gen"
+_EXP_KEY = "auth:revoked:exp"
+_BLOOM_BITS = 1 << 20
+_BLOOM_HASHES = 4
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over ``hash()``; only ever used inside one process."""
+
+    def __init__(self, bits: int = _BLOOM_BITS, hashes: int = _BLOOM_HASHES) -> None:
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray(bits // 8)
+
+    def add(self, key: str) -> None:
+        h = hash(key)
+        step = (h >> 32) | 1
+        for i in range(self.hashes):
+            pos = (h + i * step) % self.bits
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        h = hash(key)
+        step = (h >> 32) | 1
+        array, bits = self._array, self.bits
+        for i in range(self.hashes):
+            pos = (h + i * step) % bits
+            if not array[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+_UNSET = object()
+_redis = _UNSET
+# Used only without REDIS_URL (single-process development installs)
+_local_gen: dict[str, int] = {}
+_local_exp: dict[str, float] = {}
+
+_lock = threading.Lock()
+_bloom = BloomFilter()
+_synced_at = float("-inf")
+_syncing = False
+# Revoked while a sync was reading the store; added to the filter it swaps in
+_revoked_during_sync: set[str] = set()
+
+
+def _client():
+    global _redis
+    if _redis is _UNSET:
+        if not os.getenv("REDIS_URL"):
+            logger.warning("REDIS_URL not set: token revocations live in this process and are lost on restart")
+            _redis = None
+        else:
+            client = get_redis()
+            if not is_shared(client):
+                # Not cached: the next call tries Redis again
+                raise RuntimeError("token revocation needs the Redis at REDIS_URL, which is unreachable")
+            _redis = client
+    return _redis
+
+
+def _key(sub: str) -> str:
+    return sub.strip().lower()
+
+
+def _stale() -> bool:
+    return time.monotonic() - _synced_at > REVOCATION_SYNC_SECONDS
+
+
+def _sync() -> None:
+    """Rebuild the filter from the shared store, dropping expired entries.
+
+    Redis is read and pruned outside ``_lock``; only the swap holds it.
+    """
+    global _bloom, _synced_at, _syncing
+    with _lock:
+        if _syncing or not _stale():
+            return
+        _syncing = True
+        _revoked_during_sync.clear()
+    try:
+        now = time.time()
+        client = _client()
+        if client is not None:
+            entries = {
+                (k.decode() if isinstance(k, bytes) else k): float(v)
+                for k, v in client.hgetall(_EXP_KEY).items()
+            }
+            expired = [k for k, exp in entries.items() if exp <= now]
+            if expired:
+                _prune_expired(client, expired, now)
+        else:
+            with _lock:
+                entries = dict(_local_exp)
+                expired = [k for k, exp in entries.items() if exp <= now]
+                for k in expired:
+                    del _local_exp[k]
+        bloom = BloomFilter()
+        for k, exp in entries.items():
+            if exp > now:
+                bloom.add(k)
+        with _lock:
+            for k in _revoked_during_sync:
+                bloom.add(k)
+            _bloom = bloom
+            _synced_at = time.monotonic()
+    finally:
+        with _lock:
+            _syncing = False
+
+
+def _prune_expired(client, keys: list[str], now: float) -> None:
+    """Drop expiry entries still expired; a key revoked again meanwhile stays."""
+
+    # WATCH/MULTI instead of a Lua script so it also runs on fakeredis
+    def _txn(pipe) -> None:
+        current = pipe.hmget(_EXP_KEY, keys)
+        still = [k for k, v in zip(keys, current) if v is not None and float(v) <= now]
+        pipe.multi()
+        if still:
+            pipe.hdel(_EXP_KEY, *still)
+
+    client.transaction(_txn, _EXP_KEY)
+
+
+def _maybe_revoked(key: str) -> bool:
+    if _stale():
+        _sync()
+    return key in _bloom
+
+
+def _stored_generation(key: str) -> int:
+    client = _client()
+    if client is None:
+        return _local_gen.get(key, 0)
+    value = client.hget(_GEN_KEY, key)
+    return int(value) if value is not None else 0
+
+
+def generation(sub: str) -> int:
+    """Generation to stamp on a new token for ``sub``.
+
+    Read from the store, not the filter: a token issued right after a
+    revocation made by another process must not carry the old generation.
+    """
+    return _stored_generation(_key(sub))
+
+
+def is_revoked(sub: str | None, gen: int) -> bool:
+    if not sub:
+        return False
+    key = _key(sub)
+    if not _maybe_revoked(key):
+        return False
+    return gen < _stored_generation(key)
+
+
+def revoke_user(sub: str) -> int:
+    """Invalidate every token issued so far to ``sub``; returns the new generation."""
+    key = _key(sub)
+    expires = time.time() + REVOCATION_TTL_SECONDS
+    client = _client()
+    if client is not None:
+        pipe = client.pipeline()
+        pipe.hincrby(_GEN_KEY, key, 1)
+        pipe.hset(_EXP_KEY, key, expires)
+        new_gen = int(pipe.execute()[0])
+    with _lock:
+        if client is None:
+            new_gen = _local_gen[key] = _local_gen.get(key, 0) + 1
+            _local_exp[key] = expires
+        # A sync in flight may have read the store before this revocation
+        _bloom.add(key)
+        if _syncing:
+            _revoked_during_sync.add(key)
+    return new_gen
@@ -0,0 +1,75 @@
+"""Production settings for file-based SQLite (LAN installs).
+
+WAL lets readers proceed while a writer holds the database, ``busy_timeout``
+makes writers wait instead of failing with "database is locked", and the
+optional single-writer lane serializes write transactions inside the process
+so concurrent writers queue on a Python lock instead of spinning on SQLite.
+The lane is waited for at most ``SQLITE_BUSY_TIMEOUT_MS``, like SQLite's own
+lock: a thread that writes through a second session while its first one still
+holds the lane gets ``OperationalError`` instead of hanging forever.
+"""
+import os
+import sqlite3
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Engine
+
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1").lower() in ("1", "true", "yes")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB (-65536 = 64 MiB of page cache per connection)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "0").lower() in ("1", "true", "yes")
+
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+_LANE_KEY = "sqlite_write_lane"
+
+write_lane = threading.Lock()
+
+
+def is_file_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and url.rstrip("/") != "sqlite:"
+
+
+def _set_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        if SQLITE_SYNCHRONOUS in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}")
+    finally:
+        cursor.close()
+
+
+def _acquire_lane(conn, cursor, statement, parameters, context, executemany) -> None:
+    if conn.info.get(_LANE_KEY):
+        return
+    if statement.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+        if not write_lane.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            raise OperationalError(statement, parameters, sqlite3.OperationalError("database is locked"))
+        conn.info[_LANE_KEY] = True
+
+
+def _release_lane(info: dict) -> None:
+    if info.pop(_LANE_KEY, False):
+        write_lane.release()
+
+
+def configure_sqlite_engine(engine: Engine, single_writer: bool | None = None) -> None:
+    """Install the PRAGMA connect hook and, if enabled, the single-writer lane."""
+    event.listen(engine, "connect", _set_pragmas)
+    if single_writer is None:
+        single_writer = SQLITE_SINGLE_WRITER
+    if not single_writer:
+        return
+    event.listen(engine, "before_cursor_execute", _acquire_lane)
+    event.listen(engine, "commit", lambda conn: _release_lane(conn.info))
+    event.listen(engine, "rollback", lambda conn: _release_lane(conn.info))
+    # Safety net: a connection returned to the pool never keeps the lane
+    event.listen(engine.pool, "checkin", lambda dbapi_conn, record: _release_lane(record.info))
@@ -0,0 +1,58 @@
+"""Boot-time profile for the API process.
+
+Records the import cost of each module loaded through ``timed_import``, the
+time until the app is ready (lifespan startup) and until the first request
+completes, all measured from when ``main`` starts importing.
+"""
+import importlib
+import os
+import time
+
+_T0 = time.perf_counter()
+
+# Boot budget in ms (import + startup); 0 disables the warning
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "0"))
+
+_imports: dict[str, float] = {}
+_ready_ms: float | None = None
+_first_request_ms: float | None = None
+
+
+def _elapsed_ms() -> float:
+    return (time.perf_counter() - _T0) * 1000
+
+
+def timed_import(name: str, package: str | None = None):
+    start = time.perf_counter()
+    module = importlib.import_module(name, package)
+    # The first import pays the cost; later ones only hit sys.modules
+    _imports.setdefault(name.lstrip("."), round((time.perf_counter() - start) * 1000, 2))
+    return module
+
+
+def mark_ready() -> None:
+    global _ready_ms
+    if _ready_ms is None:
+        _ready_ms = round(_elapsed_ms(), 2)
+
+
+def mark_first_request() -> None:
+    global _first_request_ms
+    if _first_request_ms is None:
+        _first_request_ms = round(_elapsed_ms(), 2)
+
+
+def over_budget() -> bool:
+    return bool(STARTUP_BUDGET_MS) and _ready_ms is not None and _ready_ms > STARTUP_BUDGET_MS
+
+
+def report() -> dict:
+    imports = dict(sorted(_imports.items(), key=lambda kv: kv[1], reverse=True))
+    return {
+        "imports_ms": imports,
+        "imports_total_ms": round(sum(imports.values()), 2),
+        "ready_ms": _ready_ms,
+        "first_request_ms": _first_request_ms,
+        "budget_ms": STARTUP_BUDGET_MS or None,
+        "over_budget": over_budget(),
+    }
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from .db import get_db
+from .db import get_async_db, get_async_read_db, get_db
 from .models import StockORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
+from .etag import conditional
+from .bulk import BulkResult, BulkUpserter, iter_rows
 
 router = APIRouter(prefix="/stock", tags=["stock"])
 
@@ -29,15 +34,13 @@ class StockItem(BaseModel):
 
 
 @router.get("/", response_model=list[StockItem])
-def list_stock(
-    db: Session = Depends(get_db),
+async def list_stock(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
+    etag: str | None = Depends(conditional("stock")),
 ):
-    rows = db.query(StockORM).all()
-    return [
-        StockItem(id=r.id, item=r.item, quantity=r.quantity, unit_price=r.unit_price)
-        for r in rows
-    ]
+    return await paginate_json(db, StockItem, project(StockItem, StockORM), StockORM.id, page, etag=etag)
 
 
 @router.post("/", response_model=StockItem)
@@ -48,11 +51,25 @@ def create_stock(
 ):
     row = StockORM(item=payload.item, quantity=payload.quantity, unit_price=payload.unit_price)
     db.add(row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="stock_item_exists")
     db.refresh(row)
     return StockItem(id=row.id, item=row.item, quantity=row.quantity, unit_price=row.unit_price)
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_upsert_stock(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(require_roles(["admin"])),
+):
+    """Alta/actualización masiva por ``item`` (arreglo JSON o NDJSON)."""
+    return await BulkUpserter(db, StockCreate, StockORM, key="item").run(iter_rows(request))
+
+
 @router.put("/{stock_id}", response_model=StockItem)
 def update_stock(
     stock_id: int,
@@ -70,7 +87,11 @@ def update_stock(
     if payload.unit_price is not None:
         row.unit_price = payload.unit_price
     db.add(row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="stock_item_exists")
     db.refresh(row)
     return StockItem(id=row.id, item=row.item, quantity=row.quantity, unit_price=row.unit_price)
 
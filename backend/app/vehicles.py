@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_async_db, get_async_read_db, get_db
 from .models import VehicleORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
+from .bulk import BulkResult, BulkUpserter, iter_rows
 
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
@@ -39,23 +42,16 @@ class Vehicle(BaseModel):
 
 
 @router.get("/", response_model=list[Vehicle])
-def list_vehicles(
-    db: Session = Depends(get_db),
+async def list_vehicles(
+    customer_id: int | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
 ):
-    rows = db.query(VehicleORM).all()
-    return [
-        Vehicle(
-            id=r.id,
-            customer_id=r.customer_id,
-            plates=r.plates,
-            vin=r.vin,
-            make=r.make,
-            model=r.model,
-            year=r.year,
-        )
-        for r in rows
-    ]
+    stmt = project(Vehicle, VehicleORM)
+    if customer_id is not None:
+        stmt = stmt.where(VehicleORM.customer_id == customer_id)
+    return await paginate_json(db, Vehicle, stmt, VehicleORM.id, page)
 
 
 @router.post("/", response_model=Vehicle)
@@ -86,6 +82,16 @@ def create_vehicle(
     )
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_upsert_vehicles(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(require_roles(["admin"])),
+):
+    """Alta/actualización masiva por ``plates``; un ``vin`` repetido queda como error de fila."""
+    return await BulkUpserter(db, VehicleCreate, VehicleORM, key="plates").run(iter_rows(request))
+
+
 @router.put("/{vehicle_id}", response_model=Vehicle)
 def update_vehicle(
     vehicle_id: int,
@@ -1,10 +1,15 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from .db import get_async_read_db, get_db
 from .models import WorkOrderORM
 from .auth import require_roles
+from .pagination import PageParams, paginate_json, project
+from .etag import conditional
 
 
 router = APIRouter(prefix="/work-orders", tags=["work_orders"])
@@ -27,12 +32,26 @@ class WorkOrder(BaseModel):
 
 
 @router.get("/", response_model=list[WorkOrder])
-def list_work_orders(
-    db: Session = Depends(get_db),
+async def list_work_orders(
+    status: str | None = None,
+    quote_id: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     claims: dict = Depends(require_roles(["admin"])),
+    etag: str | None = Depends(conditional("work_orders")),
 ):
-    rows = db.query(WorkOrderORM).all()
-    return [WorkOrder(id=r.id, quote_id=r.quote_id, status=r.status) for r in rows]
+    stmt = project(WorkOrder, WorkOrderORM)
+    if status is not None:
+        stmt = stmt.where(WorkOrderORM.status == status)
+    if quote_id is not None:
+        stmt = stmt.where(WorkOrderORM.quote_id == quote_id)
+    if created_from is not None:
+        stmt = stmt.where(WorkOrderORM.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(WorkOrderORM.created_at < created_to)
+    return await paginate_json(db, WorkOrder, stmt, WorkOrderORM.id, page, etag=etag)
 
 
 @router.post("/", response_model=WorkOrder)
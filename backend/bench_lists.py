@@ -0,0 +1,87 @@
+"""Per-row cost of list serialization: ORM entities vs column projection.
+
+Usage: python -m backend.bench_lists [--rows 500] [--rounds 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.app.customers import Customer
+from backend.app.db import Base
+from backend.app.models import CustomerORM, QuoteORM
+from backend.app.pagination import PageParams, paginate_json, project
+from backend.app.quotes import Quote
+
+
+def _seed(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(CustomerORM),
+            [{"name": f"Cliente {i}", "rfc": f"RFC{i:010d}", "email": f"c{i}@x.mx"} for i in range(rows)],
+        )
+        conn.execute(
+            insert(QuoteORM),
+            [{"id": f"q{i:07d}", "customer": f"Cliente {i}", "total": i * 1.5, "token": f"t{i}"} for i in range(rows)],
+        )
+    engine.dispose()
+
+
+async def _orm_path(Session, orm, model, fields) -> bytes:
+    # What the endpoints did before: entities -> hand-built models -> response_model
+    async with Session() as db:
+        rows = (await db.execute(select(orm).order_by(orm.id))).scalars().all()
+        items = [model(**{f: getattr(r, f) for f in fields}) for r in rows]
+    adapter = TypeAdapter(list[model])
+    return json.dumps(adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")).encode()
+
+
+async def _projection_path(Session, orm, model, rows: int) -> bytes:
+    async with Session() as db:
+        response = await paginate_json(db, model, project(model, orm), orm.id, PageParams(limit=rows, after=None))
+    return response.body
+
+
+async def _bench(path: str, rows: int, rounds: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    cases = [("list_quotes", QuoteORM, Quote), ("list_customers", CustomerORM, Customer)]
+    for name, orm, model in cases:
+        fields = list(model.model_fields)
+        timings = {}
+        for label, run in (
+            ("orm + models", lambda: _orm_path(Session, orm, model, fields)),
+            ("projection", lambda: _projection_path(Session, orm, model, rows)),
+        ):
+            await run()  # warm-up
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await run()
+            timings[label] = (time.perf_counter() - start) / (rounds * rows) * 1e6
+        base = timings["orm + models"]
+        for label, us in timings.items():
+            print(f"{name:<15} {label:<14} {us:>7.2f} us/row  x{base / us:.2f}")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _seed(path, args.rows)
+        asyncio.run(_bench(path, args.rows, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,10 @@ if ROOT not in sys.path:
 # Forzar DB limpia en SQLite por cambios de esquema durante desarrollo
 DB_PATH = os.path.join(ROOT, "backend.db")
 try:
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    # En modo WAL también quedan los archivos -wal/-shm
+    for path in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
 except Exception:
     pass
 
@@ -68,8 +70,8 @@ import pytest
 
 def _try_clear_rate_limiter():
     try:
-        from backend.app.quotes import _RATE_BUCKETS  # type: ignore
-        _RATE_BUCKETS.clear()
+        from backend.app import ratelimit  # type: ignore
+        ratelimit.reset()
     except Exception:
         pass
 
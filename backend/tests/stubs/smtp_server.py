@@ -0,0 +1,64 @@
+"""Minimal threaded SMTP server for tests, in the spirit of aiosmtpd's Debugging handler."""
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, text: str) -> None:
+        self.wfile.write(text.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        server: "StubSMTPServer" = self.server  # type: ignore[assignment]
+        server.connections += 1
+        self._reply("220 stub ESMTP")
+        in_data, lines = False, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line.rstrip(b"\r\n") == b".":
+                    in_data = False
+                    if server.fail_next:
+                        server.fail_next -= 1
+                        self._reply("451 temporary failure")
+                    else:
+                        server.messages.append(b"".join(lines))
+                        self._reply("250 OK")
+                    lines = []
+                else:
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                continue
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                self._reply("250-stub\r\n250 8BITMIME")
+            elif verb in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self._reply("250 OK")
+            elif verb == b"DATA":
+                in_data = True
+                self._reply("354 end with <CRLF>.<CRLF>")
+            elif verb == b"QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("502 not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.port = self.server_address[1]
+        self.messages: list[bytes] = []
+        self.connections = 0
+        self.fail_next = 0
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app import approval_tokens
+from backend.app.db import SessionLocal, get_async_engine
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def _create_quote() -> dict:
+    r = client.post(
+        "/quotes/",
+        json={"customer": "Filtro", "total": 10},
+        headers={"Authorization": f"Bearer {make_token(['user'])}"},
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_unknown_tokens_skip_the_database(monkeypatch):
+    monkeypatch.setattr(approval_tokens, "_store", approval_tokens.RedisStore(fakeredis.FakeStrictRedis()))
+    existing = _create_quote()
+    assert approval_tokens.store().known(existing["token"]) is None
+    with SessionLocal() as db:
+        assert approval_tokens.rebuild(db) >= 1
+    created = _create_quote()
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = get_async_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        r1 = client.post("/quotes/approve-check", json={"token": "garbage"})
+        r2 = client.post("/quotes/approve-confirm", json={"token": "garbage"})
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert r1.json() == {"ok": False, "quote_id": None}
+    assert r2.status_code == 404 and r2.json()["detail"] == "quote_not_found"
+    assert statements == []
+
+    # Tokens loaded at rebuild and tokens created afterwards still resolve
+    for q in (existing, created):
+        r = client.post("/quotes/approve-check", json={"token": q["token"]})
+        assert r.json() == {"ok": True, "quote_id": q["id"]}
+
+
+def test_redis_store_is_shared_and_forgets_old_tokens():
+    server = fakeredis.FakeServer()
+    a = approval_tokens.RedisStore(fakeredis.FakeStrictRedis(server=server))
+    b = approval_tokens.RedisStore(fakeredis.FakeStrictRedis(server=server))
+    assert a.known("t1") is None
+    long_gone = datetime.now(timezone.utc) - timedelta(days=approval_tokens.APPROVAL_TOKEN_RETENTION_DAYS + 1)
+    a.add_many([("t1", approval_tokens._forget_at(None)), ("old", approval_tokens._forget_at(long_gone))])
+    a.mark_ready()
+    assert b.known("t1") is True
+    assert b.known("old") is False
+    assert b.known("nope") is False
+
+
+def test_set_needs_a_real_redis(monkeypatch):
+    # get_redis falls back to fakeredis, which is not shared between workers
+    monkeypatch.setenv("REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(approval_tokens, "get_redis", lambda: fakeredis.FakeStrictRedis())
+    monkeypatch.setattr(approval_tokens, "_store", approval_tokens._UNSET)
+    assert approval_tokens.store() is None
+    with SessionLocal() as db:
+        assert approval_tokens.rebuild(db) == 0
+    q = _create_quote()
+    r = client.post("/quotes/approve-check", json={"token": q["token"]})
+    assert r.json() == {"ok": True, "quote_id": q["id"]}
+
+
+def test_failed_remember_falls_back_to_the_database(monkeypatch):
+    target = approval_tokens.RedisStore(fakeredis.FakeStrictRedis())
+    monkeypatch.setattr(approval_tokens, "_store", target)
+    with SessionLocal() as db:
+        approval_tokens.rebuild(db)
+
+    def _down(entries):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(target, "add_many", _down)
+    q = _create_quote()
+    assert target.known(q["token"]) is None
+    r = client.post("/quotes/approve-check", json={"token": q["token"]})
+    assert r.json() == {"ok": True, "quote_id": q["id"]}
@@ -4,6 +4,8 @@ from backend.app.main import app
 from backend.app.db import SessionLocal
 from backend.app.models import UserORM
 import bcrypt
+import fakeredis
+import pytest
 
 client = TestClient(app)
 
@@ -46,3 +48,68 @@ def test_forgot_password_unknown_email_returns_404():
     r = client.post("/auth/forgot-password", json={"email": "nope@example.com"})
     assert r.status_code == 404
     assert r.json().get("detail") == "user_not_found"
+
+
+def test_password_reset_revokes_existing_tokens():
+    creds = {"email": "revoke@example.com", "password": "old"}
+    old = client.post("/auth/signup", json=creds).json()["access_token"]
+    headers = {"Authorization": f"Bearer {old}"}
+    assert client.get("/auth/roles", headers=headers).status_code == 200
+
+    client.post("/auth/forgot-password", json={"email": creds["email"]})
+    with SessionLocal() as db:
+        token = db.execute(select(UserORM.reset_token).where(UserORM.email == creds["email"])).scalar_one()
+    client.post("/auth/reset-password", json={"token": token, "password": "new"})
+
+    r = client.get("/auth/roles", headers=headers)
+    assert r.status_code == 401
+    assert r.json()["detail"] == "token_revoked"
+    assert client.post("/auth/refresh", headers=headers).status_code == 401
+
+    fresh = client.post("/auth/login", json={**creds, "password": "new"}).json()["access_token"]
+    assert client.get("/auth/roles", headers={"Authorization": f"Bearer {fresh}"}).status_code == 200
+
+
+def test_bloom_filter_has_no_false_negatives():
+    from backend.app.revocation import BloomFilter
+
+    bloom = BloomFilter(bits=1 << 12)
+    keys = [f"user{i}@example.com" for i in range(200)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+    assert sum(f"other{i}" in bloom for i in range(1000)) < 100
+
+
+def test_expired_revocation_keeps_the_generation(monkeypatch):
+    from backend.app import revocation
+
+    client = fakeredis.FakeStrictRedis()
+    monkeypatch.setattr(revocation, "_redis", client)
+    monkeypatch.setattr(revocation, "_bloom", revocation.BloomFilter())
+    monkeypatch.setattr(revocation, "_synced_at", float("-inf"))
+    assert revocation.revoke_user("gen@example.com") == 1
+    assert revocation.is_revoked("gen@example.com", 0)
+
+    # Past REVOCATION_TTL_SECONDS the filter entry goes away, the counter stays
+    client.hset(revocation._EXP_KEY, "gen@example.com", 0)
+    monkeypatch.setattr(revocation, "_synced_at", float("-inf"))
+    assert not revocation.is_revoked("gen@example.com", 0)
+    assert client.hget(revocation._EXP_KEY, "gen@example.com") is None
+    assert revocation.generation("gen@example.com") == 1
+
+    # A new revocation moves past every generation ever issued
+    assert revocation.revoke_user("gen@example.com") == 2
+    assert revocation.is_revoked("gen@example.com", 1)
+    assert not revocation.is_revoked("gen@example.com", 2)
+
+
+def test_revocation_refuses_the_fakeredis_fallback(monkeypatch):
+    from backend.app import revocation
+
+    monkeypatch.setenv("REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(revocation, "get_redis", lambda: fakeredis.FakeStrictRedis())
+    monkeypatch.setattr(revocation, "_redis", revocation._UNSET)
+    with pytest.raises(RuntimeError):
+        revocation.revoke_user("nobody@example.com")
+    assert revocation._redis is revocation._UNSET
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def _headers(**extra):
+    return {"Authorization": f"Bearer {make_token(['admin'])}", **extra}
+
+
+def test_bulk_stock_creates_then_updates():
+    rows = [{"item": f"Bulk{i}", "quantity": i, "unit_price": 1.5} for i in range(3)]
+    r = client.post("/stock/bulk", json=rows, headers=_headers())
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["created"], body["updated"], body["errors"]) == (3, 0, 0)
+    ids = [it["id"] for it in body["results"]]
+
+    rows[0]["quantity"] = 99
+    r = client.post("/stock/bulk", json=rows[:1] + [{"item": "Bulk3", "quantity": 1, "unit_price": 2}], headers=_headers())
+    body = r.json()
+    assert (body["created"], body["updated"]) == (1, 1)
+    assert body["results"][0] == {"index": 0, "status": "updated", "id": ids[0], "detail": None}
+
+    listed = {it["item"]: it for it in client.get("/stock/", headers=_headers()).json()}
+    assert listed["Bulk0"]["quantity"] == 99
+
+
+def test_bulk_customers_ndjson_with_invalid_row():
+    lines = [
+        {"name": "Uno", "rfc": "BULK010101AAA"},
+        {"name": "Sin RFC"},
+        {"name": "Publico", "rfc": "XAXX010101000"},
+        {"name": "Publico 2", "rfc": "XAXX010101000"},
+        {"name": "Uno bis", "rfc": "BULK010101AAA"},
+    ]
+    payload = "\n".join(json.dumps(line) for line in lines) + "\n"
+    r = client.post(
+        "/customers/bulk",
+        content=payload,
+        headers=_headers(**{"Content-Type": "application/x-ndjson"}),
+    )
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert [it["status"] for it in results] == ["created", "error", "created", "created", "updated"]
+    assert results[4]["id"] == results[0]["id"]
+    assert results[2]["id"] != results[3]["id"]
+
+
+def test_bulk_update_keeps_omitted_optional_fields():
+    row = {"name": "Parcial", "rfc": "PARC010101AAA", "email": "parcial@example.com", "phone": "5550001"}
+    assert client.post("/customers/bulk", json=[row], headers=_headers()).json()["created"] == 1
+    body = client.post(
+        "/customers/bulk",
+        json=[{"name": "Parcial SA", "rfc": "PARC010101AAA", "phone": None}],
+        headers=_headers(),
+    ).json()
+    assert body["updated"] == 1
+    listed = client.get("/customers/", params={"limit": 500}, headers=_headers()).json()
+    got = next(c for c in listed if c["id"] == body["results"][0]["id"])
+    assert (got["name"], got["email"], got["phone"]) == ("Parcial SA", "parcial@example.com", None)
+
+
+def test_update_to_taken_natural_key_is_conflict():
+    a = client.post("/stock/", json={"item": "Tomado A", "quantity": 1, "unit_price": 1}, headers=_headers()).json()
+    client.post("/stock/", json={"item": "Tomado B", "quantity": 1, "unit_price": 1}, headers=_headers())
+    r = client.put(f"/stock/{a['id']}", json={"item": "Tomado B"}, headers=_headers())
+    assert r.status_code == 409 and r.json()["detail"] == "stock_item_exists"
+
+    c = client.post("/customers/", json={"name": "C1", "rfc": "TOMA010101AAA"}, headers=_headers()).json()
+    client.post("/customers/", json={"name": "C2", "rfc": "TOMA010101BBB"}, headers=_headers())
+    r = client.put(f"/customers/{c['id']}", json={"rfc": "TOMA010101BBB"}, headers=_headers())
+    assert r.status_code == 409 and r.json()["detail"] == "customer_rfc_exists"
+
+
+def test_bulk_vehicles_duplicate_vin_is_row_error():
+    customer = client.post(
+        "/customers/", json={"name": "Flotilla", "rfc": "FLOT010101AAA"}, headers=_headers()
+    ).json()
+    rows = [
+        {"customer_id": customer["id"], "plates": "BLK-001", "vin": "VINBULK1"},
+        {"customer_id": customer["id"], "plates": "BLK-002", "vin": "VINBULK1"},
+    ]
+    body = client.post("/vehicles/bulk", json=rows, headers=_headers()).json()
+    assert [it["status"] for it in body["results"]] == ["created", "error"]
+    assert body["results"][1]["detail"] == "integrity_error"
+
+
+def test_bulk_rejects_non_array_and_duplicate_single_create():
+    r = client.post("/stock/bulk", json={"item": "x"}, headers=_headers())
+    assert r.status_code == 400
+    assert r.json()["detail"] == "invalid_payload"
+
+    payload = {"item": "UniqueBulk", "quantity": 1, "unit_price": 1.0}
+    assert client.post("/stock/", json=payload, headers=_headers()).status_code == 200
+    r = client.post("/stock/", json=payload, headers=_headers())
+    assert r.status_code == 409
+    assert r.json()["detail"] == "stock_item_exists"
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import update
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.db import SessionLocal
+from backend.app.models import CfdiPendingORM
+import backend.app.cfdi_queue as cfdi_queue
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def _publish_everything() -> None:
+    with SessionLocal() as db:
+        while cfdi_queue.relay_outbox(db):
+            pass
+
+
+def test_approval_writes_outbox_and_relay_publishes_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("S3_ENDPOINT", "")
+    monkeypatch.setenv("S3_LOCAL_DIR", str(tmp_path))
+    redis = fakeredis.FakeStrictRedis()
+    monkeypatch.setattr(cfdi_queue, "redis_client", redis)
+    _publish_everything()
+    redis.delete("cfdi_queue")
+
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    q = client.post("/quotes/", json={"customer": "Outbox", "total": 20}, headers=headers).json()
+    assert client.post(f"/quotes/{q['id']}/approve", headers=headers).status_code == 200
+
+    # Nothing is pushed from the request: the row waits in the outbox
+    assert redis.llen("cfdi_queue") == 0
+    with SessionLocal() as db:
+        pending = db.query(CfdiPendingORM).filter_by(quote_id=q["id"]).one()
+        pending_id = pending.id
+        assert pending.status == "pending" and pending.published_at is None
+        assert cfdi_queue.relay_outbox(db) == 1
+        assert cfdi_queue.relay_outbox(db) == 0
+    assert redis.llen("cfdi_queue") == 1
+
+    # Unacknowledged after the republish window: pushed again
+    with SessionLocal() as db:
+        db.execute(
+            update(CfdiPendingORM)
+            .where(CfdiPendingORM.id == pending_id)
+            .values(published_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        db.commit()
+        assert cfdi_queue.relay_outbox(db) == 1
+    assert redis.llen("cfdi_queue") == 2
+
+    # The duplicate delivery is claimed once and processed once
+    with SessionLocal() as db:
+        assert cfdi_queue.process_cfdi_queue(db, limit=5) == 1
+        assert db.get(CfdiPendingORM, pending_id).status == "sent"
+        assert cfdi_queue.relay_outbox(db) == 0
+
+
+def test_relay_reclaims_rows_stuck_in_processing(monkeypatch):
+    redis = fakeredis.FakeStrictRedis()
+    monkeypatch.setattr(cfdi_queue, "redis_client", redis)
+    _publish_everything()
+    redis.delete("cfdi_queue")
+
+    stale = datetime.now(timezone.utc) - timedelta(seconds=cfdi_queue.CFDI_PROCESSING_TIMEOUT_SECONDS + 60)
+    with SessionLocal() as db:
+        # A worker claimed both rows and died; one of them is out of attempts
+        alive = cfdi_queue.add_cfdi_draft(db, "stuck-1", "Stuck", 10)
+        spent = cfdi_queue.add_cfdi_draft(db, "stuck-2", "Stuck", 10)
+        db.flush()
+        alive_id, spent_id = alive.id, spent.id
+        db.execute(
+            update(CfdiPendingORM)
+            .where(CfdiPendingORM.id.in_([alive_id, spent_id]))
+            .values(status="processing", updated_at=stale, published_at=stale)
+        )
+        db.execute(
+            update(CfdiPendingORM)
+            .where(CfdiPendingORM.id == spent_id)
+            .values(attempts=cfdi_queue.MAX_ATTEMPTS)
+        )
+        db.commit()
+        assert cfdi_queue.relay_outbox(db) == 2
+        assert db.get(CfdiPendingORM, alive_id).status == "pending"
+        assert db.get(CfdiPendingORM, spent_id).status == "failed"
+        assert cfdi_queue.relay_outbox(db) == 0
+    assert redis.llen("cfdi_queue") == 1
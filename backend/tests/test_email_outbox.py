@@ -0,0 +1,88 @@
+import socket
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from backend.app.main import app
+from backend.app.db import SessionLocal
+from backend.app.email import OutboxSender, queue_email
+from backend.app.models import EmailOutboxORM
+from backend.tests.stubs.smtp_server import StubSMTPServer
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def _empty_outbox():
+    with SessionLocal() as db:
+        db.execute(delete(EmailOutboxORM))
+        db.commit()
+
+
+def _queue(n: int) -> None:
+    with SessionLocal() as db:
+        for i in range(n):
+            queue_email(db, f"to{i}@example.com", f"Asunto {i}", "Hola")
+        db.commit()
+
+
+def _rows() -> list[EmailOutboxORM]:
+    with SessionLocal() as db:
+        return list(db.execute(select(EmailOutboxORM).order_by(EmailOutboxORM.recipient)).scalars())
+
+
+def test_forgot_password_only_queues_email(monkeypatch):
+    def _no_smtp(*args, **kwargs):
+        raise AssertionError("request path must not talk to SMTP")
+
+    monkeypatch.setattr("smtplib.SMTP", _no_smtp)
+    r = client.post("/auth/forgot-password", json={"email": "admin@example.com"})
+    assert r.status_code == 200
+    (row,) = _rows()
+    assert row.recipient == "admin@example.com"
+    assert row.status == "pending"
+    assert "reset-password/" in row.body
+
+
+def test_sender_batches_over_one_connection(monkeypatch):
+    with StubSMTPServer() as smtp:
+        monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+        monkeypatch.setenv("SMTP_PORT", str(smtp.port))
+        sender = OutboxSender(SessionLocal, batch_size=10)
+        _queue(3)
+        assert sender.send_batch() == 3
+        _queue(2)
+        assert sender.send_batch() == 2
+        sender.close()
+    assert smtp.connections == 1
+    assert len(smtp.messages) == 5
+    assert all(row.status == "sent" and row.sent_at for row in _rows())
+
+
+def test_failed_message_is_retried_with_backoff(monkeypatch):
+    with StubSMTPServer() as smtp:
+        smtp.fail_next = 1
+        monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+        monkeypatch.setenv("SMTP_PORT", str(smtp.port))
+        sender = OutboxSender(SessionLocal)
+        _queue(2)
+        assert sender.send_batch() == 1
+        # El reintento aún no vence
+        assert sender.send_batch() == 0
+        sender.close()
+    failed = [row for row in _rows() if row.status == "pending"]
+    assert len(failed) == 1
+    assert failed[0].attempts == 1
+    assert failed[0].locked_by is None
+
+
+def test_unreachable_server_keeps_messages_pending(monkeypatch):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    _queue(2)
+    assert OutboxSender(SessionLocal).send_batch() == 0
+    assert [(row.status, row.attempts) for row in _rows()] == [("pending", 1), ("pending", 1)]
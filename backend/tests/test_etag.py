@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event, select
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.db import SessionLocal, engine
+from backend.app.models import StockORM, TableVersionORM
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def test_stock_list_304_until_write():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    r = client.get("/stock/", headers=headers)
+    etag = r.headers["ETag"]
+
+    r2 = client.get("/stock/", headers={**headers, "If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+    assert r2.headers["ETag"] == etag
+
+    # Otro query string (filtros/cursor) nunca comparte ETag
+    assert client.get("/stock/", params={"limit": 1}, headers=headers).headers["ETag"] != etag
+
+    client.post("/stock/", json={"item": "EtagItem", "quantity": 1, "unit_price": 1.0}, headers=headers)
+    r3 = client.get("/stock/", headers={**headers, "If-None-Match": etag})
+    assert r3.status_code == 200
+    assert r3.headers["ETag"] != etag
+
+
+def test_quote_transition_invalidates_quotes_and_bulk_invalidates_stock():
+    user = {"Authorization": f"Bearer {make_token(['user'])}"}
+    admin = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    q = client.post("/quotes/", json={"customer": "Etag", "total": 1}, headers=user).json()
+    etag = client.get("/quotes/", headers=user).headers["ETag"]
+    client.post(f"/quotes/{q['id']}/reject", headers=admin)
+    assert client.get("/quotes/", headers={**user, "If-None-Match": etag}).status_code == 200
+
+    stock_etag = client.get("/stock/", headers=admin).headers["ETag"]
+    client.post("/stock/bulk", json=[{"item": "EtagBulk", "quantity": 2, "unit_price": 1}], headers=admin)
+    assert client.get("/stock/", headers={**admin, "If-None-Match": stock_etag}).status_code == 200
+
+
+def test_work_orders_etag_requires_auth_first():
+    r = client.get("/work-orders/", headers={"If-None-Match": "*"})
+    assert r.status_code == 401
+
+
+def _stock_version() -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(TableVersionORM.version).where(TableVersionORM.table_name == "stock")
+        ).scalar_one()
+
+
+def test_version_bumped_after_commit_not_inside_the_write():
+    before = _stock_version()
+    events: list[str] = []
+
+    def _statement(conn, cursor, statement, *args):
+        events.append(statement.split()[0] + (" table_versions" if "table_versions" in statement else ""))
+
+    def _commit(conn):
+        events.append("COMMIT")
+
+    event.listen(engine, "before_cursor_execute", _statement)
+    event.listen(engine, "commit", _commit)
+    try:
+        with SessionLocal() as db:
+            db.add(StockORM(item="EtagLock", quantity=1, unit_price=1.0))
+            db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", _statement)
+        event.remove(engine, "commit", _commit)
+    # The writer's transaction never touches (and locks) the counter row
+    assert events == ["INSERT", "COMMIT", "UPDATE table_versions", "COMMIT"]
+    assert _stock_version() == before + 1
+
+    with SessionLocal() as db:
+        db.add(StockORM(item="EtagRolledBack", quantity=1, unit_price=1.0))
+        db.flush()
+        db.rollback()
+    assert _stock_version() == before + 1
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def test_export_invoices_ndjson_and_csv():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    r = client.post("/invoices/", json={"customer": "Export", "total": 42.0}, headers=headers)
+    assert r.status_code == 200, r.text
+    invoice_id = r.json()["id"]
+
+    r_nd = client.get("/exports/invoices", headers=headers)
+    assert r_nd.status_code == 200
+    assert r_nd.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r_nd.text.splitlines() if line]
+    assert any(row["id"] == invoice_id and row["total"] == 42.0 for row in rows)
+
+    r_csv = client.get("/exports/invoices", params={"format": "csv"}, headers=headers)
+    assert r_csv.status_code == 200
+    assert r_csv.headers["content-type"].startswith("text/csv")
+    reader = list(csv.DictReader(io.StringIO(r_csv.text)))
+    assert any(row["id"] == str(invoice_id) and row["customer"] == "Export" for row in reader)
+
+
+def test_export_requires_admin_and_known_table():
+    r = client.get("/exports/quotes", headers={"Authorization": f"Bearer {make_token(['user'])}"})
+    assert r.status_code == 403
+
+    admin = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    r2 = client.get("/exports/users", headers=admin)
+    assert r2.status_code == 404
+    assert r2.json().get("detail") == "export_not_found"
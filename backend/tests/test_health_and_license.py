@@ -1,8 +1,22 @@
+from datetime import datetime, timedelta, timezone
+
 from fastapi.testclient import TestClient
+from jose import jwt
+
 from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
 
 client = TestClient(app)
 
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
 def test_health_endpoint():
     r = client.get("/health")
     assert r.status_code == 200
@@ -20,3 +34,15 @@ def test_license_status_endpoint():
     assert data.get("status") == "valid"
     assert data.get("exp") is None
 
+
+
+def test_startup_profile_reports_router_imports():
+    client.get("/health")
+    assert client.get("/startup-profile").status_code == 401
+    user = {"Authorization": f"Bearer {make_token(['user'])}"}
+    assert client.get("/startup-profile", headers=user).status_code == 403
+    r = client.get("/startup-profile", headers={"Authorization": f"Bearer {make_token(['admin'])}"})
+    assert r.status_code == 200
+    data = r.json()
+    assert "quotes" in data["imports_ms"]
+    assert data["first_request_ms"] is not None
@@ -9,3 +9,11 @@ def test_metrics_endpoint():
     assert r.status_code == 200
     assert "text/plain" in r.headers.get("content-type", "")
     assert b"# HELP" in r.content
+
+
+def test_metrics_include_db_pool_stats():
+    client.get("/health")
+    r = client.get("/metrics")
+    assert b"db_pool_checked_out" in r.content
+    assert b"db_pool_overflow" in r.content
+    assert b"db_pool_checkout_wait_seconds_count" in r.content
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.pagination import NEXT_CURSOR_HEADER
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def test_stock_keyset_pagination_walks_all_rows():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    created = []
+    for i in range(5):
+        r = client.post(
+            "/stock/",
+            json={"item": f"Page{i}", "quantity": i, "unit_price": 1.0},
+            headers=headers,
+        )
+        assert r.status_code == 200, r.text
+        created.append(r.json()["id"])
+
+    seen: list[int] = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after:
+            params["after"] = after
+        r = client.get("/stock/", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        assert len(page) <= 2
+        seen.extend(it["id"] for it in page)
+        after = r.headers.get(NEXT_CURSOR_HEADER)
+        if not after:
+            break
+
+    assert seen == sorted(seen)
+    assert set(created) <= set(seen)
+
+
+def test_quotes_filter_by_status():
+    token_user = make_token(["user"])
+    token_admin = make_token(["admin"])
+    r = client.post(
+        "/quotes/",
+        json={"customer": "Filter", "total": 1},
+        headers={"Authorization": f"Bearer {token_user}"},
+    )
+    q = r.json()
+    client.post(f"/quotes/{q['id']}/reject", headers={"Authorization": f"Bearer {token_admin}"})
+
+    r2 = client.get(
+        "/quotes/",
+        params={"status": "rejected"},
+        headers={"Authorization": f"Bearer {token_user}"},
+    )
+    assert r2.status_code == 200
+    rows = r2.json()
+    assert any(it["id"] == q["id"] for it in rows)
+    assert all(it["status"] == "rejected" for it in rows)
+
+
+def test_invalid_cursor_returns_400():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    r = client.get("/customers/", params={"after": "%%%"}, headers=headers)
+    assert r.status_code == 400
+    assert r.json().get("detail") == "invalid_cursor"
+
+
+def test_projected_list_matches_response_model():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    for i in range(3):
+        client.post("/customers/", json={"name": f"Proj{i}", "rfc": f"PROJ0101010{i}"}, headers=headers)
+    r = client.get("/customers/", params={"limit": 2}, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    assert r.headers.get(NEXT_CURSOR_HEADER)
+    assert all(set(it) == {"id", "name", "rfc", "email", "phone"} for it in r.json())
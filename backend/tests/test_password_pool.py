@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app import password_pool
+
+client = TestClient(app)
+
+
+def test_signup_and_login_hash_on_process_pool():
+    creds = {"email": "pool@example.com", "password": "s3cret"}
+    assert client.post("/auth/signup", json=creds).status_code == 201
+    r = client.post("/auth/login", json=creds)
+    assert r.status_code == 200, r.text
+    assert password_pool.PASSWORD_POOL_WORKERS == 0 or password_pool._executor is not None
+    metrics = client.get("/metrics").text
+    assert "password_hash_seconds" in metrics
+    assert "password_pool_pending" in metrics
+
+
+def test_saturated_pool_returns_503(monkeypatch):
+    monkeypatch.setattr(password_pool, "PASSWORD_POOL_WORKERS", 1)
+    monkeypatch.setattr(password_pool, "PASSWORD_POOL_MAX_PENDING", 0)
+    r = client.post("/auth/signup", json={"email": "busy@example.com", "password": "x"})
+    assert r.status_code == 503
+    assert r.json()["detail"] == "auth_busy"
+    assert r.headers["Retry-After"] == "1"
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import text
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.db import SessionLocal, engine
+from backend.app.models import QuoteORM
+from backend.app import quote_expiry
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def test_sweeper_expires_pending_quotes_in_batches():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    quotes = [
+        client.post("/quotes/", json={"customer": f"Vence{i}", "total": 1}, headers=headers).json()
+        for i in range(3)
+    ]
+    stale, approved, fresh = quotes
+    assert client.post(f"/quotes/{approved['id']}/approve", headers=headers).status_code == 200
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE quotes SET token_expires_at = :ts WHERE id IN (:a, :b)"),
+            {"ts": datetime.now(timezone.utc) - timedelta(minutes=1), "a": stale["id"], "b": approved["id"]},
+        )
+
+    before = quote_expiry.QUOTES_EXPIRED._value.get()
+    with SessionLocal() as db:
+        assert quote_expiry.sweep(db, batch_size=1) >= 1
+        assert quote_expiry.sweep(db, batch_size=1) == 0
+        status = {q.id: q.status for q in db.query(QuoteORM).filter(QuoteORM.id.in_([q["id"] for q in quotes]))}
+    assert status == {stale["id"]: "expired", approved["id"]: "approved", fresh["id"]: "pending"}
+    assert quote_expiry.QUOTES_EXPIRED._value.get() - before >= 1
+    assert "quotes_expired_total" in client.get("/metrics").text
+
+    r = client.post(f"/quotes/{stale['id']}/approve", headers=headers)
+    assert r.status_code == 409
+    assert r.json()["detail"] == "invalid_transition"
+    r = client.post("/quotes/approve-confirm", json={"token": stale["token"]})
+    assert r.status_code == 410
+
+
+def test_sweep_uses_expiry_index():
+    with engine.connect() as conn:
+        plan = conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM quotes WHERE status = 'pending' "
+                "AND token_expires_at < :now ORDER BY token_expires_at LIMIT 500"
+            ),
+            {"now": datetime.now(timezone.utc)},
+        ).all()
+    assert any("idx_quotes_token_expiry" in row[-1] for row in plan)
@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event, text
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.db import SessionLocal, engine, get_async_engine
+from backend.app import quote_expiry, quote_rollup
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+HEADERS = {"Authorization": f"Bearer {make_token(['admin'])}"}
+
+
+def _summary(**params) -> dict:
+    r = client.get("/quotes/summary", params=params, headers=HEADERS)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _quote(customer: str, total: float) -> dict:
+    return client.post("/quotes/", json={"customer": customer, "total": total}, headers=HEADERS).json()
+
+
+def test_rollup_tracks_every_write_path():
+    customer = "Embudo"
+    a, b, c, d, e = (_quote(customer, t) for t in (100, 200, 300, 400, 500))
+    client.post(f"/quotes/{a['id']}/approve", headers=HEADERS)
+    client.post(f"/quotes/{b['id']}/reject", headers=HEADERS)
+    client.post("/quotes/batch", json={"ids": [c["id"]], "action": "approve"}, headers=HEADERS)
+    client.post("/quotes/approve-confirm", json={"token": d["token"]})
+    # An item replaces the typed total of the still-pending quote
+    client.post(
+        "/quote-items/",
+        json={"quote_id": e["id"], "description": "Servicio", "qty": 1, "unit_price": 50, "tax_rate": 16},
+        headers=HEADERS,
+    )
+    extra = _quote(customer, 70)
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE quotes SET token_expires_at = :ts WHERE id = :id"),
+            {"ts": datetime.now(timezone.utc) - timedelta(minutes=1), "id": extra["id"]},
+        )
+    with SessionLocal() as db:
+        quote_expiry.sweep(db)
+
+    data = _summary(customer=customer)
+    assert data["funnel"] == {
+        "approved": {"count": 3, "total": 800.0},
+        "rejected": {"count": 1, "total": 200.0},
+        "pending": {"count": 1, "total": 58.0},
+        "expired": {"count": 1, "total": 70.0},
+    }
+    today = datetime.now(timezone.utc).date()
+    week = _summary(customer=customer, period="week", by_customer=True)["series"]
+    assert {row["period"] for row in week} == {(today - timedelta(days=today.weekday())).isoformat()}
+    assert all(row["customer"] == customer for row in week)
+
+    # A rebuild from scratch agrees with the incremental rollup
+    with SessionLocal() as db:
+        quote_rollup.rebuild(db)
+    assert _summary(customer=customer)["funnel"] == data["funnel"]
+
+
+def test_summary_reads_only_the_rollup():
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async_engine = get_async_engine().sync_engine
+    event.listen(async_engine, "before_cursor_execute", _count)
+    try:
+        _summary(date_from=date(2000, 1, 1).isoformat())
+    finally:
+        event.remove(async_engine, "before_cursor_execute", _count)
+    assert len(statements) == 1
+    assert "FROM quote_rollups" in statements[0]
+
+
+def test_lost_transition_race_leaves_rollup_untouched():
+    customer = "Carrera"
+    q = _quote(customer, 100)
+    raced = []
+
+    def _approve_first(conn, cursor, statement, *args):
+        # Another request approves the quote right after the reject read it as pending
+        if not raced and statement.lstrip().startswith("SELECT quotes.id"):
+            raced.append(True)
+            with engine.begin() as other:
+                other.execute(text("UPDATE quotes SET status = 'approved' WHERE id = :id"), {"id": q["id"]})
+
+    event.listen(engine, "after_cursor_execute", _approve_first)
+    try:
+        r = client.post(f"/quotes/{q['id']}/reject", headers=HEADERS)
+    finally:
+        event.remove(engine, "after_cursor_execute", _approve_first)
+    assert r.status_code == 409 and r.json()["detail"] == "invalid_transition"
+    # Only the pending row created with the quote; the raw UPDATE bypassed the rollup
+    assert _summary(customer=customer)["funnel"]["pending"] == {"count": 1, "total": 100.0}
+    assert "rejected" not in _summary(customer=customer)["funnel"]
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event
+
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+from backend.app.db import engine
+
+client = TestClient(app)
+
+
+def make_token(roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": "tester", "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def _quote(quote_id: str, headers: dict) -> dict:
+    r = client.get("/quotes/", params={"limit": 500}, headers=headers)
+    return next(q for q in r.json() if q["id"] == quote_id)
+
+
+def test_item_changes_maintain_quote_totals():
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    q = client.post("/quotes/", json={"customer": "Totales", "total": 50}, headers=headers).json()
+    assert (q["subtotal"], q["tax_total"], q["total"]) == (50, 0, 50)
+
+    r = client.post(
+        "/quote-items/",
+        json={"quote_id": q["id"], "description": "Servicio", "qty": 2, "unit_price": 100, "tax_rate": 16},
+        headers=headers,
+    )
+    assert r.status_code == 200, r.text
+    item = r.json()
+    client.post(
+        "/quote-items/",
+        json={"quote_id": q["id"], "description": "Refacción", "qty": 1, "unit_price": 50},
+        headers=headers,
+    )
+    got = _quote(q["id"], headers)
+    assert got["subtotal"] == 250
+    assert got["tax_total"] == 32
+    assert got["total"] == 282
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        r = client.put(f"/quote-items/{item['id']}", json={"qty": 1}, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert r.status_code == 200
+    # One aggregate UPDATE of the quote, no reload of its items
+    touching_items = [s for s in statements if "quote_items.quote_id =" in s]
+    assert len(touching_items) == 1 and touching_items[0].startswith("UPDATE quotes SET")
+    got = _quote(q["id"], headers)
+    assert (got["subtotal"], got["tax_total"], got["total"]) == (150, 16, 166)
+
+    assert client.delete(f"/quote-items/{item['id']}", headers=headers).status_code == 200
+    got = _quote(q["id"], headers)
+    assert (got["subtotal"], got["tax_total"], got["total"]) == (50, 0, 50)
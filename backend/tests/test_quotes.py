@@ -323,3 +323,99 @@ def test_create_quote_missing_fields_returns_422():
         headers={"Authorization": f"Bearer {token}"},
     )
     assert r.status_code == 422
+
+
+def test_batch_approve_and_reject():
+    from sqlalchemy import event
+
+    from backend.app.db import SessionLocal
+    from backend.app.models import CfdiPendingORM
+
+    def _drafts():
+        with SessionLocal() as db:
+            return db.query(CfdiPendingORM).filter(CfdiPendingORM.quote_id.in_(ids)).count()
+
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    ids = [
+        client.post("/quotes/", json={"customer": f"Lote{i}", "total": 10 + i}, headers=headers).json()["id"]
+        for i in range(4)
+    ]
+    assert client.post(f"/quotes/{ids[3]}/reject", headers=headers).status_code == 200
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(" ".join(statement.split()[:3]))
+
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        r = client.post(
+            "/quotes/batch",
+            json={"ids": [ids[0], ids[1], ids[1], ids[3], "nope"], "action": "approve"},
+            headers=headers,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["updated"] == 2
+    outcomes = {res["id"]: res for res in data["results"]}
+    assert len(data["results"]) == 4
+    assert outcomes[ids[0]] == {"id": ids[0], "ok": True, "status": "approved", "detail": None}
+    assert outcomes[ids[3]]["detail"] == "invalid_transition"
+    assert outcomes["nope"]["detail"] == "quote_not_found"
+    # One UPDATE for the quotes and one multi-row INSERT for the cfdi_pending outbox
+    assert statements.count("INSERT INTO cfdi_pending") == 1
+    assert _drafts() == 2
+
+    r = client.post("/quotes/batch", json={"ids": [ids[0], ids[2]], "action": "reject"}, headers=headers)
+    outcomes = {res["id"]: res for res in r.json()["results"]}
+    assert outcomes[ids[0]]["detail"] == "invalid_transition"
+    assert outcomes[ids[2]] == {"id": ids[2], "ok": True, "status": "rejected", "detail": None}
+    assert _drafts() == 2
+
+    user = {"Authorization": f"Bearer {make_token(['user'])}"}
+    r = client.post("/quotes/batch", json={"ids": ids, "action": "approve"}, headers=user)
+    assert r.status_code == 403
+
+
+def test_get_quote_detail_loads_relations_in_fixed_queries():
+    from sqlalchemy import event
+
+    from backend.app.db import get_async_engine
+
+    headers = {"Authorization": f"Bearer {make_token(['admin'])}"}
+    customer = client.post("/customers/", json={"name": "Detalle", "rfc": "XAXX010101000"}, headers=headers).json()
+    q = client.post("/quotes/", json={"customer": "Detalle", "total": 10}, headers=headers).json()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE quotes SET customer_id = :c WHERE id = :q"), {"c": customer["id"], "q": q["id"]})
+    for price in (30, 20):
+        client.post(
+            "/quote-items/",
+            json={"quote_id": q["id"], "description": f"Pieza {price}", "qty": 1, "unit_price": price},
+            headers=headers,
+        )
+    wo = client.post("/work-orders/", json={"quote_id": q["id"]}, headers=headers).json()
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async_engine = get_async_engine().sync_engine
+    event.listen(async_engine, "before_cursor_execute", _count)
+    try:
+        r = client.get(f"/quotes/{q['id']}", headers=headers)
+    finally:
+        event.remove(async_engine, "before_cursor_execute", _count)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["total"] == 50
+    assert [i["description"] for i in data["items"]] == ["Pieza 30", "Pieza 20"]
+    assert data["customer_obj"]["id"] == customer["id"]
+    assert data["work_order"]["id"] == wo["id"]
+    assert len(statements) == 2
+
+    r = client.get("/quotes/nope", headers=headers)
+    assert r.status_code == 404
+    assert r.json()["detail"] == "quote_not_found"
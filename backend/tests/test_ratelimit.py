@@ -0,0 +1,63 @@
+import fakeredis
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app import ratelimit
+
+client = TestClient(app)
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    allowed, tat, _ = ratelimit._gcra(None, 100.0, limit=2, period=10)
+    assert allowed
+    allowed, tat, _ = ratelimit._gcra(tat, 100.0, limit=2, period=10)
+    assert allowed
+    allowed, _, retry_after = ratelimit._gcra(tat, 100.0, limit=2, period=10)
+    assert not allowed and retry_after == 5.0
+    # One emission interval later a single request fits again
+    allowed, _, _ = ratelimit._gcra(tat, 105.0, limit=2, period=10)
+    assert allowed
+
+
+def test_memory_backend_is_bounded():
+    store = ratelimit.MemoryBackend(max_keys=3)
+    for i in range(10):
+        assert store.hit(f"k{i}", limit=1, period=60) == (True, 0.0)
+    assert len(store) == 3
+    allowed, retry_after = store.hit("k9", limit=1, period=60)
+    assert not allowed and retry_after > 0
+
+
+def test_memory_backend_keeps_denied_keys_recent():
+    store = ratelimit.MemoryBackend(max_keys=2)
+    assert store.hit("busy", limit=1, period=60)[0]
+    store.hit("idle", limit=1, period=60)
+    # Denied, but still the most recently hit key
+    assert not store.hit("busy", limit=1, period=60)[0]
+    store.hit("new", limit=1, period=60)
+    assert not store.hit("busy", limit=1, period=60)[0]
+
+
+def test_redis_backend_shares_state_between_instances():
+    server = fakeredis.FakeServer()
+    a = ratelimit.RedisBackend(fakeredis.FakeStrictRedis(server=server))
+    b = ratelimit.RedisBackend(fakeredis.FakeStrictRedis(server=server))
+    assert a.hit("login:x", limit=2, period=60)[0]
+    assert b.hit("login:x", limit=2, period=60)[0]
+    allowed, retry_after = a.hit("login:x", limit=2, period=60)
+    assert not allowed and 0 < retry_after <= 30
+    ttl = a.client.pttl("ratelimit:login:x")
+    assert 0 < ttl <= 60_000
+
+
+def test_login_is_rate_limited_per_email(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_backend", ratelimit.MemoryBackend())
+    creds = {"email": "Limited@Example.com", "password": "wrong"}
+    for _ in range(10):
+        assert client.post("/auth/login", json=creds).status_code == 401
+    r = client.post("/auth/login", json={**creds, "email": "limited@example.com"})
+    assert r.status_code == 429
+    assert r.json()["detail"] == "rate_limited"
+    assert int(r.headers["Retry-After"]) >= 1
+    # Other accounts are unaffected
+    assert client.post("/auth/login", json={"email": "other@example.com", "password": "x"}).status_code == 401
@@ -107,3 +107,27 @@ def test_refresh_reflects_role_changes():
         headers={"Authorization": f"Bearer {new_token}"},
     )
     assert r_ok.status_code == 200
+
+
+def test_verified_claims_cache_hits_and_expires(monkeypatch):
+    from backend.app import auth
+
+    calls = []
+    real_decode = auth.decode_access_token
+    monkeypatch.setattr(auth, "decode_access_token", lambda t: calls.append(t) or real_decode(t))
+    auth._claims_cache.clear()
+
+    token = make_token(["admin"])
+    assert auth.verify_token(token)["roles"] == ["admin"]
+    assert auth.verify_token(token)["roles"] == ["admin"]
+    assert len(calls) == 1
+
+    # Una entrada vencida se vuelve a verificar
+    key, (claims, _) = next(iter(auth._claims_cache.items()))
+    auth._claims_cache[key] = (claims, 0.0)
+    auth.verify_token(token)
+    assert len(calls) == 2
+
+    monkeypatch.setattr(auth, "JWT_CACHE_SIZE", 0)
+    auth.verify_token(token)
+    assert len(calls) == 3
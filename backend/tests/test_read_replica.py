@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import backend.app.db as db
+import backend.app.main as main
+from backend.app.main import app
+from backend.app.auth import SECRET, ALGO
+
+client = TestClient(app)
+
+
+def make_token(sub, roles):
+    now = datetime.now(timezone.utc)
+    return jwt.encode(
+        {"sub": sub, "roles": roles, "exp": int((now + timedelta(hours=1)).timestamp())},
+        SECRET,
+        algorithm=ALGO,
+    )
+
+
+def test_reads_use_replica_except_after_own_write(tmp_path, monkeypatch):
+    # Réplica vacía: lo que se lea de ella no verá las escrituras del primario
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(db, "ReadSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(main, "DATABASE_READ_URL", "sqlite:///replica.db")
+    monkeypatch.setattr(db, "_recent_writes", {})
+    monkeypatch.setattr(db, "_writes_redis", None)
+
+    writer = {"Authorization": f"Bearer {make_token('writer', ['admin'])}"}
+    other = {"Authorization": f"Bearer {make_token('other', ['admin'])}"}
+    # Como el BFF: un cliente sin cookies, solo el header Authorization
+    other_client = TestClient(app)
+
+    r = client.post("/invoices/", json={"customer": "Replica", "total": 1.0}, headers=writer)
+    assert r.status_code == 200
+    assert not r.cookies
+    client.cookies.clear()
+    invoice_id = r.json()["id"]
+
+    # Mismo usuario justo después de escribir: lee del primario
+    assert client.get(f"/invoices/{invoice_id}", headers=writer).status_code == 200
+    # Otro usuario: lee de la réplica (aún sin la fila)
+    assert other_client.get(f"/invoices/{invoice_id}", headers=other).status_code == 404
+
+    monkeypatch.setattr(db, "DB_READ_AFTER_WRITE_SECONDS", 0)
+    assert client.get(f"/invoices/{invoice_id}", headers=writer).status_code == 404
+    replica.dispose()
+
+
+def test_read_after_write_marker_is_shared_and_needs_a_valid_token(tmp_path, monkeypatch):
+    import fakeredis
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(db, "ReadSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(main, "DATABASE_READ_URL", "sqlite:///replica.db")
+    monkeypatch.setattr(db, "_recent_writes", {})
+    # Marker in (shared) Redis: a second worker would see it too
+    monkeypatch.setattr(db, "_writes_redis", fakeredis.FakeStrictRedis())
+
+    writer = {"Authorization": f"Bearer {make_token('shared-writer', ['admin'])}"}
+    r = client.post("/invoices/", json={"customer": "Replica", "total": 1.0}, headers=writer)
+    invoice_id = r.json()["id"]
+    assert db._recent_writes == {}
+    assert client.get(f"/invoices/{invoice_id}", headers=writer).status_code == 200
+
+    # Same sub, bad signature: not trusted, reads the replica
+    forged = jwt.encode({"sub": "shared-writer", "roles": ["admin"]}, "not-the-secret", algorithm=ALGO)
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {forged}".encode())]})
+    assert db.read_from_primary(request) is False
+    replica.dispose()
@@ -56,3 +56,43 @@ def test_get_roles_returns_current_user_roles():
     resp = client.get("/auth/roles", headers={"Authorization": f"Bearer {token}"})
     assert resp.status_code == 200
     assert resp.json()["roles"] == ["user"]
+
+
+def test_auth_paths_are_single_round_trip():
+    from sqlalchemy import event
+
+    from backend.app import auth
+    from backend.app.db import engine, get_async_engine
+
+    client.post("/auth/signup", json={"email": "trip@example.com", "password": "secret"})
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    async_engine = get_async_engine().sync_engine
+    event.listen(async_engine, "before_cursor_execute", _count)
+    try:
+        r = client.post("/auth/login", json={"email": "trip@example.com", "password": "secret"})
+    finally:
+        event.remove(async_engine, "before_cursor_execute", _count)
+    assert r.status_code == 200
+    assert len(statements) == 1
+
+    # Con el catálogo caliente, asignar un rol conocido no consulta roles
+    assert "user" in auth._role_ids
+    statements.clear()
+    token, _ = create_access_token("admin@example.com", ["admin"])
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        r = client.post(
+            "/auth/roles",
+            json={"email": "trip@example.com", "role": "user"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    assert r.status_code == 200
+    assert len(statements) == 1
+    assert statements[0].lstrip().startswith("SELECT users.")
@@ -0,0 +1,23 @@
+import pytest
+
+import backend.app.main as main
+
+
+def test_schema_check_strict_refuses_outdated_schema(monkeypatch):
+    monkeypatch.setattr(main, "get_schema_revisions", lambda: ({"old"}, {"head"}))
+    monkeypatch.setattr(main, "DB_SCHEMA_CHECK", "strict")
+    with pytest.raises(RuntimeError):
+        main._check_schema()
+
+
+def test_schema_check_warn_and_off_do_not_raise(monkeypatch):
+    monkeypatch.setattr(main, "get_schema_revisions", lambda: ({"old"}, {"head"}))
+    monkeypatch.setattr(main, "DB_SCHEMA_CHECK", "warn")
+    main._check_schema()
+
+    def _boom():
+        raise AssertionError("should not query the version table")
+
+    monkeypatch.setattr(main, "get_schema_revisions", _boom)
+    monkeypatch.setattr(main, "DB_SCHEMA_CHECK", "off")
+    main._check_schema()
@@ -16,3 +16,11 @@ def test_signup_creates_user_and_hashes_password():
     with SessionLocal() as db:
         user = db.execute(select(UserORM).where(UserORM.email == "new@example.com")).scalar_one()
         assert bcrypt.checkpw("secret".encode(), user.hashed_password.encode())
+
+
+def test_login_after_signup_returns_roles():
+    r = client.post("/auth/signup", json={"email": "login@example.com", "password": "secret"})
+    assert r.status_code == 201
+    r2 = client.post("/auth/login", json={"email": "LOGIN@example.com", "password": "secret"})
+    assert r2.status_code == 200, r2.text
+    assert r2.json()["roles"] == ["user"]
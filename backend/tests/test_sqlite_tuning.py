@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from backend.app import sqlite_tuning
+from backend.app.sqlite_tuning import configure_sqlite_engine, write_lane
+
+
+def test_tuned_engine_sets_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    configure_sqlite_engine(engine, single_writer=False)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_single_writer_lane_released_on_commit_and_rollback(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'lane.db'}")
+    configure_sqlite_engine(engine, single_writer=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        assert write_lane.locked()
+    assert not write_lane.locked()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert not write_lane.locked()
+        conn.execute(text("INSERT INTO t (id) VALUES (1)"))
+        assert write_lane.locked()
+        conn.rollback()
+    assert not write_lane.locked()
+    engine.dispose()
+
+
+def test_nested_session_write_fails_instead_of_hanging(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_tuning, "SQLITE_BUSY_TIMEOUT_MS", 50)
+    engine = create_engine(f"sqlite:///{tmp_path / 'nested.db'}")
+    configure_sqlite_engine(engine, single_writer=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+    with engine.connect() as outer:
+        outer.execute(text("INSERT INTO t (id) VALUES (1)"))
+        # Same thread, second connection: the lane is held by ``outer``
+        with engine.connect() as inner:
+            with pytest.raises(OperationalError, match="database is locked"):
+                inner.execute(text("INSERT INTO t (id) VALUES (2)"))
+        outer.commit()
+    assert not write_lane.locked()
+    engine.dispose()
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from backend.app.db import Base
+from backend.app.models import UserORM, normalize_email
+
+
+def _login_stmt():
+    return select(UserORM).where(UserORM.email == normalize_email(" Admin@Example.com "))
+
+
+def test_email_is_stored_normalized():
+    assert UserORM(email=" MiXed@Example.COM ", hashed_password="x").email == "mixed@example.com"
+
+
+def test_sqlite_plan_uses_email_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plan.db'}")
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        sql = str(_login_stmt().compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "USING INDEX ix_users_email" in plan or "USING COVERING INDEX ix_users_email" in plan, plan
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_postgres_plan_uses_email_index():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(engine, tables=[UserORM.__table__])
+    with engine.connect() as conn:
+        # Tabla casi vacía: sin esto el planner prefiere el seq scan
+        conn.execute(text("SET enable_seqscan = off"))
+        sql = str(_login_stmt().compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[0] for row in conn.execute(text(f"EXPLAIN {sql}")))
+    assert "ix_users_email" in plan, plan